@@ -0,0 +1,162 @@
+"""
+Cross-model time alignment
+Fuses prosody, burst and language segments into one timeline at ingest
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Interval = Tuple[float, float]
+
+
+def sweep_join(anchors: Sequence[Interval], items: Sequence[Interval]) -> List[Optional[int]]:
+    """
+    Match each item interval to the anchor it overlaps most
+
+    Sorted sweep: anchors and items are visited in begin order with a
+    pointer that only moves forward, so non-overlapping anchors (utterances)
+    are joined in O((n + m) log m) instead of comparing every pair.
+
+    Args:
+        anchors: Anchor intervals, sorted by begin and non-overlapping
+        items: Item intervals (any order)
+
+    Returns:
+        Anchor index per item, or None if it overlaps no anchor
+    """
+    matches: List[Optional[int]] = [None] * len(items)
+    first = 0
+
+    for item in sorted(range(len(items)), key=lambda i: items[i][0]):
+        begin, end = items[item]
+        # Anchors ending before this item can't overlap it or any later item
+        while first < len(anchors) and anchors[first][1] <= begin:
+            first += 1
+
+        best, best_overlap = None, 0.0
+        j = first
+        while j < len(anchors) and anchors[j][0] < end:
+            overlap = min(end, anchors[j][1]) - max(begin, anchors[j][0])
+            if overlap > best_overlap:
+                best, best_overlap = j, overlap
+            j += 1
+        # Zero-length items (instants) belong to the anchor containing them
+        if best is None and begin == end and first < len(anchors) and anchors[first][0] <= begin:
+            best = first
+        matches[item] = best
+
+    return matches
+
+
+def _time(segment: Dict[str, Any]) -> Optional[Interval]:
+    time = segment.get("time") or {}
+    if time.get("begin") is None or time.get("end") is None:
+        return None
+    return float(time["begin"]), float(time["end"])
+
+
+def _text_spans(prosody: List[Dict[str, Any]], language: List[Dict[str, Any]]) -> List[Interval]:
+    """
+    Character spans of prosody utterances in the transcript
+
+    Language positions are offsets into the transcript, which is rebuilt
+    from the language sentences; each utterance text is then located in it
+    in order (falling back to the running offset when it can't be found).
+    """
+    length = max((s.get("position", {}).get("end") or 0 for s in language), default=0)
+    transcript = [" "] * length
+    for segment in language:
+        begin = segment.get("position", {}).get("begin")
+        end = segment.get("position", {}).get("end")
+        if begin is None or end is None:
+            continue
+        transcript[begin:end] = list(segment.get("text", "")[:end - begin].ljust(end - begin))
+    transcript = "".join(transcript)
+
+    spans = []
+    cursor = 0
+    for segment in prosody:
+        text = (segment.get("text") or "").strip()
+        found = transcript.find(text, cursor) if text else -1
+        begin = found if found >= 0 else cursor
+        cursor = begin + len(text)
+        spans.append((float(begin), float(cursor)))
+    return spans
+
+
+def build_timeline(parsed: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Aligned segment array over the prosody utterances
+
+    Each entry covers one prosody utterance and lists the segment_ids of the
+    bursts and language sentences aligned to it; bursts outside every
+    utterance get entries of their own. Language sentences are aligned by
+    time when Hume returns it, otherwise by text position.
+
+    Args:
+        parsed: Result of parse_predictions
+
+    Returns:
+        {"total_segments", "segments", "unaligned_language"}, or None without prosody
+    """
+    prosody = (parsed.get("speech_prosody") or {}).get("segments", [])
+    bursts = (parsed.get("vocal_burst") or {}).get("segments", [])
+    language = (parsed.get("language") or {}).get("segments", [])
+
+    utterances = [s for s in prosody if _time(s)]
+    if not utterances:
+        return None
+    utterances.sort(key=lambda s: _time(s)[0])
+    anchors = [_time(s) for s in utterances]
+
+    entries = [
+        {
+            "time": s["time"],
+            "text": s.get("text", ""),
+            "prosody": s["segment_id"],
+            "burst": [],
+            "language": []
+        }
+        for s in utterances
+    ]
+
+    # Bursts onto utterance time windows
+    timed_bursts = [s for s in bursts if _time(s)]
+    for burst, anchor in zip(timed_bursts, sweep_join(anchors, [_time(s) for s in timed_bursts])):
+        if anchor is None:
+            entries.append({
+                "time": burst["time"],
+                "text": "",
+                "prosody": None,
+                "burst": [burst["segment_id"]],
+                "language": []
+            })
+        else:
+            entries[anchor]["burst"].append(burst["segment_id"])
+
+    # Language sentences by time if available, otherwise by transcript position
+    if language and all(_time(s) for s in language):
+        language_matches = sweep_join(anchors, [_time(s) for s in language])
+    else:
+        positions = [
+            (float(s.get("position", {}).get("begin") or 0), float(s.get("position", {}).get("end") or 0))
+            for s in language
+        ]
+        language_matches = sweep_join(_text_spans(utterances, language), positions)
+
+    unaligned = []
+    for sentence, anchor in zip(language, language_matches):
+        if anchor is None:
+            unaligned.append(sentence["segment_id"])
+        else:
+            entries[anchor]["language"].append(sentence["segment_id"])
+
+    entries.sort(key=lambda e: float(e["time"]["begin"]))
+    for entry in entries:
+        entry["burst"].sort()
+        entry["language"].sort()
+
+    return {
+        "total_segments": len(entries),
+        "segments": entries,
+        "unaligned_language": unaligned
+    }
@@ -0,0 +1,275 @@
+"""
+Circuit breaker and rate governor for Hume API
+Shared by every task in the process so retries back off together
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.state_backend import MemoryBackend, StateBackend
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_throttle_status(status_code: Optional[int]) -> bool:
+    """True for responses that mean the upstream is overloaded (429/5xx)"""
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Header value, either delta-seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if missing/invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HumeGovernor:
+    """
+    Circuit breaker plus adaptive token bucket for job submission
+
+    - Failures (429/5xx/network) are tracked over a sliding window; when the
+      error rate crosses the threshold the circuit opens and new submissions
+      wait in the queue.
+    - Retry-After headers extend the pause.
+    - Each failure halves the submission rate and each success raises it
+      additively (AIMD), so isolated errors only slow submissions briefly.
+    - After the cooldown the circuit is half-open: submissions resume at the
+      minimum rate and ramp up on success; any failure reopens it.
+    - With a shared StateBackend the open circuit and a global per-second
+      admission cap (max_rate) apply across all workers.
+    """
+
+    OPEN_UNTIL_KEY = "hume:circuit:open_until"
+    ADMIT_KEY = "hume:admit:"
+
+    def __init__(
+        self,
+        max_rate: float = 5.0,
+        min_rate: float = 0.2,
+        error_threshold: float = 0.5,
+        window_seconds: float = 60.0,
+        min_requests: int = 5,
+        cooldown: float = 30.0,
+        max_wait: float = 300.0,
+        backend: Optional[StateBackend] = None
+    ):
+        """
+        Initialize governor
+
+        Args:
+            max_rate: Maximum job submissions per second
+            min_rate: Submission rate right after the circuit reopens
+            error_threshold: Error ratio that opens the circuit
+            window_seconds: Sliding window for the error ratio
+            min_requests: Minimum calls in the window before it can open
+            cooldown: Seconds the circuit stays open (unless Retry-After is longer)
+            max_wait: Longest a submission waits in the queue before failing
+            backend: Shared state backend (default: process-local memory)
+        """
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.error_threshold = error_threshold
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.backend = backend or MemoryBackend()
+
+        self.state = CLOSED
+        self.rate = max_rate
+        self._open_until = 0.0
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, deadline: Optional[float] = None):
+        """
+        Wait for permission to submit a new job
+
+        Args:
+            deadline: time.monotonic() by which to be admitted (default: now + max_wait);
+                      lets a re-submission after throttling share the original budget
+
+        Raises:
+            TimeoutError: If the circuit stays closed to traffic past the deadline
+        """
+        deadline = deadline if deadline is not None else time.monotonic() + self.max_wait
+
+        async with self._lock:
+            while True:
+                await self._pull_shared()
+                now = time.monotonic()
+                self._end_cooldown(now)
+                wait = self._open_until - now
+
+                if wait <= 0:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        if await self._admit_globally():
+                            self._tokens -= 1
+                            return
+                        # Global cap for this second reached - try in the next one
+                        wait = 1 - (time.time() % 1)
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+
+                if now + wait > deadline:
+                    raise TimeoutError(
+                        f"Hume circuit {self.state}: submission not admitted within {self.max_wait:.0f}s"
+                    )
+                await asyncio.sleep(wait)
+
+    async def wait_if_open(self):
+        """Pause while the circuit is open (used by status polls)"""
+        await self._pull_shared()
+        wait = self._open_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._end_cooldown(time.monotonic())
+
+    async def record_success(self):
+        """Record a successful Hume call"""
+        self._end_cooldown(time.monotonic())
+        self._record(ok=True)
+
+        # Additive increase, also in CLOSED so scattered failures don't pin the rate
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+        if self.state == HALF_OPEN and self.rate >= self.max_rate:
+            self.state = CLOSED
+            logger.info("Hume circuit closed - full rate restored")
+
+    async def record_failure(
+        self,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        """
+        Record a failed Hume call
+
+        Args:
+            status_code: HTTP status code (None for network errors)
+            retry_after: Seconds from the Retry-After header, if any
+        """
+        now = time.monotonic()
+        self._end_cooldown(now)
+        self._record(ok=False)
+
+        # Multiplicative decrease
+        self.rate = max(self.min_rate, self.rate / 2)
+
+        if retry_after:
+            self._open(now, retry_after, f"Retry-After {retry_after:.0f}s (HTTP {status_code})")
+        elif self.state == HALF_OPEN:
+            self._open(now, self.cooldown, f"failure while half-open (HTTP {status_code})")
+        elif self.state == CLOSED and self._error_ratio_exceeded(now):
+            self._open(now, self.cooldown, f"error ratio above {self.error_threshold:.0%}")
+        else:
+            return
+
+        await self._push_shared()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current governor state, for diagnostics"""
+        now = time.monotonic()
+        self._end_cooldown(now)
+        self._trim(now)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "state": self.state,
+            "rate": round(self.rate, 3),
+            "open_for": round(max(0.0, self._open_until - now), 1),
+            "window_requests": len(self._outcomes),
+            "window_failures": failures
+        }
+
+    async def _push_shared(self):
+        """Publish the open circuit so other workers pause too"""
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            await self.backend.set(self.OPEN_UNTIL_KEY, str(time.time() + remaining), ttl=remaining)
+
+    async def _pull_shared(self):
+        """Adopt a circuit opened by another worker"""
+        value = await self.backend.get(self.OPEN_UNTIL_KEY)
+        if not value:
+            return
+        remaining = float(value) - time.time()
+        # Tolerance skips our own publication (same deadline)
+        if remaining > 0 and time.monotonic() + remaining > self._open_until + 0.5:
+            self._open(time.monotonic(), remaining, "opened by another worker")
+
+    async def _admit_globally(self) -> bool:
+        """Per-second admission counter shared by all workers"""
+        second = int(time.time())
+        admitted = await self.backend.incr(f"{self.ADMIT_KEY}{second}", ttl=2)
+        return admitted <= max(1, int(self.max_rate))
+
+    def _open(self, now: float, duration: float, reason: str):
+        self._open_until = max(self._open_until, now + duration)
+        if self.state != OPEN:
+            logger.warning(f"Hume circuit opened for {duration:.0f}s: {reason}")
+        self.state = OPEN
+
+    def _end_cooldown(self, now: float):
+        """Move an open circuit whose cooldown has passed to half-open"""
+        if self.state == OPEN and self._open_until <= now:
+            self._half_open()
+
+    def _half_open(self):
+        self.state = HALF_OPEN
+        self.rate = self.min_rate
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        logger.info(f"Hume circuit half-open - resuming at {self.rate:.2f} jobs/s")
+
+    def _refill(self, now: float):
+        self._tokens = min(1.0, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def _error_ratio_exceeded(self, now: float) -> bool:
+        self._trim(now)
+        total = len(self._outcomes)
+        if total < self.min_requests:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / total >= self.error_threshold
@@ -0,0 +1,171 @@
+"""
+Graceful shutdown drain
+Tracks this worker's pipeline tasks and hands unfinished jobs over for resume
+"""
+
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Coroutine, Dict, List, Optional, Tuple
+
+from app.state_backend import StateBackend
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+
+class JobTracker:
+    """
+    Pipeline tasks running in this worker
+
+    Pipelines run as tracked tasks rather than request BackgroundTasks, so
+    shutdown can wait for them with a deadline instead of having them killed
+    with the process. Once draining starts no new work is admitted.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self._tasks: Dict[Key, Tuple[asyncio.Task, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, spec: Dict[str, Any], coro: Coroutine) -> asyncio.Task:
+        """
+        Run a pipeline as a tracked task
+
+        Args:
+            spec: Job description (device_id, recorded_at, file_path, options)
+                  persisted if the job cannot finish before shutdown
+            coro: Pipeline coroutine
+
+        Returns:
+            The task
+        """
+        key = (spec["device_id"], spec["recorded_at"])
+        task = asyncio.create_task(coro)
+        self._tasks[key] = (task, spec)
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+    async def drain(self, timeout: float) -> List[Dict[str, Any]]:
+        """
+        Stop admitting work and wait for running pipelines
+
+        Args:
+            timeout: Seconds to wait before cancelling what is left
+
+        Returns:
+            Specs of the pipelines that were cancelled
+        """
+        self.draining = True
+        running = dict(self._tasks)
+        if not running:
+            return []
+
+        logger.info(f"Draining {len(running)} in-flight job(s) (up to {timeout:g}s)")
+        await asyncio.wait([task for task, _ in running.values()], timeout=timeout)
+
+        unfinished = [(task, spec) for task, spec in running.values() if not task.done()]
+        for task, _ in unfinished:
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in unfinished), return_exceptions=True)
+
+        if unfinished:
+            logger.warning(f"{len(unfinished)} job(s) did not finish before shutdown")
+        return [spec for _, spec in unfinished]
+
+
+class PendingJobStore:
+    """
+    Jobs interrupted by a shutdown, waiting to be resumed
+
+    With a shared state backend the entries are visible to the surviving
+    workers; with the in-memory backend they are written to a JSON file
+    and picked up by the next startup.
+    """
+
+    PREFIX = "pending:"
+
+    def __init__(self, backend: StateBackend, path: Optional[str] = None):
+        """
+        Initialize store
+
+        Args:
+            backend: Shared state backend
+            path: JSON file used when the backend is process-local
+        """
+        self.backend = backend
+        self.path = path or os.getenv("PENDING_JOBS_FILE", "pending_jobs.json")
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.name != "memory"
+
+    @classmethod
+    def _key(cls, device_id: str, recorded_at: str) -> str:
+        return f"{cls.PREFIX}{device_id}|{recorded_at}"
+
+    async def save(self, specs: List[Dict[str, Any]]):
+        """Persist interrupted jobs"""
+        if not specs:
+            return
+
+        interrupted_at = datetime.utcnow().isoformat()
+        specs = [{**spec, "interrupted_at": interrupted_at} for spec in specs]
+
+        if self.shared:
+            for spec in specs:
+                await self.backend.set(
+                    self._key(spec["device_id"], spec["recorded_at"]), json.dumps(spec)
+                )
+        else:
+            existing = self._read_file()
+            existing.update({self._key(s["device_id"], s["recorded_at"]): s for s in specs})
+            with open(self.path, "w") as f:
+                json.dump(list(existing.values()), f, indent=2)
+
+        logger.info(f"Persisted {len(specs)} interrupted job(s) for resume")
+
+    async def keys(self) -> List[Key]:
+        """(device_id, recorded_at) of every pending job"""
+        if self.shared:
+            keys = await self.backend.keys(f"{self.PREFIX}*")
+            return [tuple(key[len(self.PREFIX):].split("|", 1)) for key in keys]
+        return [(s["device_id"], s["recorded_at"]) for s in self._read_file().values()]
+
+    async def take(self, device_id: str, recorded_at: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove and return one pending job
+
+        Callers must hold the job's in-flight claim so only one worker takes it.
+        """
+        key = self._key(device_id, recorded_at)
+
+        if self.shared:
+            raw = await self.backend.get(key)
+            await self.backend.delete(key)
+            return json.loads(raw) if raw else None
+
+        entries = self._read_file()
+        spec = entries.pop(key, None)
+        if entries:
+            with open(self.path, "w") as f:
+                json.dump(list(entries.values()), f, indent=2)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        return spec
+
+    def _read_file(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                specs = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable pending jobs file {self.path}: {e}")
+            return {}
+        return {self._key(s["device_id"], s["recorded_at"]): s for s in specs}
@@ -0,0 +1,380 @@
+"""
+Emotion similarity index
+Normalized per-segment emotion vectors for "find moments like this one" queries
+"""
+
+import os
+import time
+import fcntl
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app import json_codec
+from app.emotions import EMOTION_SPACES
+
+logger = logging.getLogger(__name__)
+
+# Parsed result section holding the segments of each vector space
+RESULT_SECTIONS = {
+    "prosody": "speech_prosody",
+    "language": "language"
+}
+
+
+def emotion_vector(emotions: Dict[str, float], space: str) -> Optional[List[float]]:
+    """
+    L2-normalized emotion vector in the fixed category order of a space
+
+    Returns:
+        The vector, or None if no known emotion has a positive score
+    """
+    values = [float(emotions.get(name, 0.0)) for name in EMOTION_SPACES[space]]
+    norm = sum(v * v for v in values) ** 0.5
+    if norm == 0:
+        return None
+    return [v / norm for v in values]
+
+
+def result_segments(result: Dict[str, Any], space: str) -> List[Dict[str, Any]]:
+    """Segments of one vector space in a parsed Hume result"""
+    return (result.get(RESULT_SECTIONS[space]) or {}).get("segments", [])
+
+
+class EmotionIndex:
+    """
+    Interface for segment vector indexes
+
+    Implementations store one row per segment (device_id, recorded_at,
+    segment_id + vector) per space and answer top-k cosine similarity
+    queries. A pgvector-backed implementation can replace the local store
+    behind this interface.
+    """
+
+    name = "base"
+
+    async def add_result(self, device_id: str, recorded_at: str, result: Dict[str, Any]) -> int:
+        """Index every segment of a parsed result, replacing earlier rows of the recording"""
+        raise NotImplementedError
+
+    async def get_vector(
+        self, space: str, device_id: str, recorded_at: str, segment_id: int
+    ) -> Optional[List[float]]:
+        """Stored vector of one segment"""
+        raise NotImplementedError
+
+    async def search(
+        self,
+        space: str,
+        vector: Sequence[float],
+        k: int = 10,
+        device_id: Optional[str] = None,
+        exclude: Optional[Tuple[str, str]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Top-k most similar segments
+
+        Args:
+            space: "prosody" or "language"
+            vector: Normalized query vector
+            k: Number of matches
+            device_id: Only search this device
+            exclude: (device_id, recorded_at) to leave out (the query's own recording)
+
+        Returns:
+            (matches with score and segment details, number of rows searched)
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Live rows per space"""
+        return {}
+
+    async def close(self):
+        pass
+
+
+async def index_rows(index: Optional[EmotionIndex], rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    Index the successful results of bulk-saved rows
+
+    Args:
+        index: Target index (None does nothing)
+        rows: Dicts with device_id, recorded_at and emotion_data
+
+    Returns:
+        Number of segments indexed (failures are logged, not raised)
+    """
+    if not index:
+        return 0
+
+    added = 0
+    for row in rows:
+        if row["emotion_data"].get("error"):
+            continue
+        try:
+            added += await index.add_result(row["device_id"], row["recorded_at"], row["emotion_data"])
+        except Exception as e:
+            logger.warning(f"Failed to index {row['device_id']} at {row['recorded_at']}: {e}")
+    return added
+
+
+class _SpaceStore:
+    """
+    Append-only vectors of one space
+
+    <space>.f32 holds float32 rows and is memory-mapped for search;
+    <space>.jsonl holds one metadata line per row. Writers append under an
+    exclusive file lock, so several workers can share a directory; each
+    process picks up new rows by the file sizes before searching.
+    """
+
+    def __init__(self, np, directory: str, space: str):
+        self.np = np
+        self.space = space
+        self.dim = len(EMOTION_SPACES[space])
+        self.vectors_path = os.path.join(directory, f"{space}.f32")
+        self.meta_path = os.path.join(directory, f"{space}.jsonl")
+        self.lock_path = os.path.join(directory, f"{space}.lock")
+
+        self.rows = 0
+        self._meta_offset = 0
+        self._meta: List[Tuple[int, Any, Optional[str], Optional[str]]] = []
+        self._keys: List[Tuple[str, str, int]] = []
+        self._rows_by_segment: Dict[Tuple[str, str, int], int] = {}
+        self._recordings: Dict[Tuple[str, str], Tuple[str, int]] = {}
+        self._recording_codes = np.zeros(0, dtype=np.int32)
+        self._device_codes = np.zeros(0, dtype=np.int32)
+        self._recording_ids: Dict[Tuple[str, str], int] = {}
+        self._device_ids: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._vectors = None
+
+        for path in (self.vectors_path, self.meta_path):
+            open(path, "ab").close()
+
+    def append(self, device_id: str, recorded_at: str, rows: List[Tuple[Dict[str, Any], List[float]]]):
+        """Append one recording's rows (a batch replaces earlier batches of the recording)"""
+        batch = f"{time.time_ns()}-{os.getpid()}"
+        lines = "".join(
+            json_codec.dumps_str({
+                "device_id": device_id,
+                "recorded_at": recorded_at,
+                "batch": batch,
+                "segment_id": segment.get("segment_id"),
+                "time": segment.get("time") or segment.get("position"),
+                "text": segment.get("text") or None,
+                "dominant": (segment.get("dominant_emotion") or {}).get("name")
+            }) + "\n"
+            for segment, _ in rows
+        )
+        vectors = self.np.asarray([vector for _, vector in rows], dtype=self.np.float32)
+
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Rows become visible once both files hold them
+                with open(self.meta_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Load rows appended since the last refresh (by any process)"""
+        np = self.np
+        vector_rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        if vector_rows <= self.rows:
+            return
+
+        with open(self.meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            chunk = f.read()
+        # Only complete lines, and never more rows than vectors written
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        lines = complete.splitlines()[:vector_rows - self.rows]
+        if not lines:
+            return
+        self._meta_offset += sum(len(line) + 1 for line in lines)
+
+        start = self.rows
+        recording_codes = np.empty(len(lines), dtype=np.int32)
+        device_codes = np.empty(len(lines), dtype=np.int32)
+        self._live = np.concatenate([self._live, np.ones(len(lines), dtype=bool)])
+
+        for i, line in enumerate(lines):
+            meta = json_codec.loads(line)
+            row = start + i
+            recording = (meta["device_id"], meta["recorded_at"])
+            code = self._recording_ids.setdefault(recording, len(self._recording_ids))
+            recording_codes[i] = code
+            device_codes[i] = self._device_ids.setdefault(meta["device_id"], len(self._device_ids))
+
+            previous = self._recordings.get(recording)
+            if previous is None or previous[0] != meta["batch"]:
+                if previous is not None:
+                    # Re-analysis: retire the recording's earlier rows
+                    self._live[:start][self._recording_codes == code] = False
+                    self._live[start:row][recording_codes[:i] == code] = False
+                self._recordings[recording] = (meta["batch"], row)
+
+            key = (*recording, meta["segment_id"])
+            self._keys.append(key)
+            self._rows_by_segment[key] = row
+            self._meta.append((meta["segment_id"], meta["time"], meta["text"], meta["dominant"]))
+
+        self._recording_codes = np.concatenate([self._recording_codes, recording_codes])
+        self._device_codes = np.concatenate([self._device_codes, device_codes])
+        self.rows = start + len(lines)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+
+    def vector(self, device_id: str, recorded_at: str, segment_id: int) -> Optional[List[float]]:
+        row = self._rows_by_segment.get((device_id, recorded_at, segment_id))
+        if row is None or not self._live[row]:
+            return None
+        return self._vectors[row].tolist()
+
+    def search(self, vector, k: int, device_id: Optional[str], exclude: Optional[Tuple[str, str]]):
+        np = self.np
+        if not self.rows:
+            return [], 0
+
+        mask = self._live.copy()
+        if device_id is not None:
+            code = self._device_ids.get(device_id)
+            if code is None:
+                return [], 0
+            mask &= self._device_codes == code
+        if exclude is not None and exclude in self._recording_ids:
+            mask &= self._recording_codes != self._recording_ids[exclude]
+
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [], 0
+
+        # Rows are unit vectors: the dot product is the cosine similarity
+        query = np.asarray(vector, dtype=np.float32)
+        if len(candidates) == self.rows:
+            scores = self._vectors @ query
+        else:
+            scores = self._vectors[candidates] @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for i in top:
+            row = int(candidates[i]) if len(candidates) != self.rows else int(i)
+            device, recorded_at, segment_id = self._keys[row]
+            _, segment_time, text, dominant = self._meta[row]
+            matches.append({
+                "device_id": device,
+                "recorded_at": recorded_at,
+                "segment_id": segment_id,
+                "score": round(float(scores[i]), 6),
+                "time": segment_time,
+                "text": text,
+                "dominant_emotion": dominant
+            })
+        return matches, len(candidates)
+
+    def live_rows(self) -> int:
+        return int(self._live.sum())
+
+
+class NumpyEmotionIndex(EmotionIndex):
+    """Local memory-mapped NumPy store with exact (brute-force) search"""
+
+    name = "numpy"
+
+    def __init__(self, directory: str):
+        """
+        Initialize index
+
+        Args:
+            directory: Directory holding the vector and metadata files
+        """
+        # Optional dependency - only needed when the index is enabled
+        import numpy as np
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.spaces = {space: _SpaceStore(np, directory, space) for space in EMOTION_SPACES}
+        self._lock = threading.Lock()
+        for store in self.spaces.values():
+            store.refresh()
+        logger.info(f"Emotion index loaded from {directory}: {self.stats()}")
+
+    async def add_result(self, device_id: str, recorded_at: str, result: Dict[str, Any]) -> int:
+        return await asyncio.to_thread(self._add_result, device_id, recorded_at, result)
+
+    def _add_result(self, device_id: str, recorded_at: str, result: Dict[str, Any]) -> int:
+        added = 0
+        for space, store in self.spaces.items():
+            rows = []
+            for segment in result_segments(result, space):
+                vector = emotion_vector(segment.get("emotions", {}), space)
+                if vector is not None:
+                    rows.append((segment, vector))
+            if rows:
+                with self._lock:
+                    store.append(device_id, recorded_at, rows)
+                added += len(rows)
+        return added
+
+    async def get_vector(
+        self, space: str, device_id: str, recorded_at: str, segment_id: int
+    ) -> Optional[List[float]]:
+        return await asyncio.to_thread(self._get_vector, space, device_id, recorded_at, segment_id)
+
+    def _get_vector(self, space, device_id, recorded_at, segment_id):
+        store = self.spaces[space]
+        with self._lock:
+            store.refresh()
+            return store.vector(device_id, recorded_at, segment_id)
+
+    async def search(
+        self,
+        space: str,
+        vector: Sequence[float],
+        k: int = 10,
+        device_id: Optional[str] = None,
+        exclude: Optional[Tuple[str, str]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        return await asyncio.to_thread(self._search, space, vector, k, device_id, exclude)
+
+    def _search(self, space, vector, k, device_id, exclude):
+        store = self.spaces[space]
+        with self._lock:
+            store.refresh()
+            return store.search(vector, k, device_id, exclude)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            for store in self.spaces.values():
+                store.refresh()
+            return {space: store.live_rows() for space, store in self.spaces.items()}
+
+
+def create_emotion_index(path: Optional[str] = None) -> Optional[EmotionIndex]:
+    """
+    Create the index configured by EMOTION_INDEX_PATH
+
+    Args:
+        path: Index directory ("" disables the index)
+
+    Returns:
+        Index instance, or None if disabled or NumPy is unavailable
+    """
+    path = os.getenv("EMOTION_INDEX_PATH", "emotion_index") if path is None else path
+    if not path:
+        return None
+
+    try:
+        return NumpyEmotionIndex(path)
+    except ImportError:
+        logger.warning("numpy is not installed - emotion similarity index disabled")
+        return None
@@ -0,0 +1,26 @@
+"""
+Hume emotion taxonomies
+Fixed category order used for emotion vectors
+"""
+
+# Speech Prosody (and the streaming models): 48 emotions
+PROSODY_EMOTIONS = (
+    "Admiration", "Adoration", "Aesthetic Appreciation", "Amusement", "Anger", "Anxiety",
+    "Awe", "Awkwardness", "Boredom", "Calmness", "Concentration", "Confusion",
+    "Contemplation", "Contempt", "Contentment", "Craving", "Desire", "Determination",
+    "Disappointment", "Disgust", "Distress", "Doubt", "Ecstasy", "Embarrassment",
+    "Empathic Pain", "Entrancement", "Envy", "Excitement", "Fear", "Guilt",
+    "Horror", "Interest", "Joy", "Love", "Nostalgia", "Pain",
+    "Pride", "Realization", "Relief", "Romance", "Sadness", "Satisfaction",
+    "Shame", "Surprise (negative)", "Surprise (positive)", "Sympathy", "Tiredness", "Triumph"
+)
+
+# Emotional Language: the prosody set plus 5 text-only emotions (53)
+LANGUAGE_EMOTIONS = tuple(sorted(
+    PROSODY_EMOTIONS + ("Annoyance", "Disapproval", "Enthusiasm", "Gratitude", "Sarcasm")
+))
+
+EMOTION_SPACES = {
+    "prosody": PROSODY_EMOTIONS,
+    "language": LANGUAGE_EMOTIONS
+}
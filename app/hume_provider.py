@@ -8,26 +8,67 @@ import json
 import time
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from datetime import datetime
 import base64
 
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from app import json_codec
+from app.alignment import build_timeline
+from app.circuit_breaker import HumeGovernor, is_throttle_status, parse_retry_after
+from app.offload import ParsePool
+from app.state_backend import StateBackend
+from app.turnaround import TurnaroundStats, poll_delays
 
 logger = logging.getLogger(__name__)
 
 
+class HumeAPIError(Exception):
+    """Error response from Hume API"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        """True if Hume is overloaded (429/5xx) - not worth an immediate retry"""
+        return is_throttle_status(self.status_code)
+
+
+def _retryable(exc: BaseException) -> bool:
+    """Retry transient errors, but leave throttling to the governor and fail fast on 4xx"""
+    if not isinstance(exc, HumeAPIError):
+        return True
+    # A 404 for an expired job (or a rejected request) won't change on retry
+    client_error = exc.status_code is not None and 400 <= exc.status_code < 500
+    return not (exc.throttled or client_error)
+
+
 class HumeProvider:
     """Provider for Hume AI emotion analysis"""
 
-    def __init__(self, api_key: str, secret_key: str):
+    # Models requested by create_job unless the caller narrows them
+    DEFAULT_MODELS = ("prosody", "burst", "language")
+    DEFAULT_PROSODY_GRANULARITY = "utterance"
+    DEFAULT_LANGUAGE_GRANULARITY = "sentence"  # sentence-level for better Japanese support
+
+    def __init__(self, api_key: str, secret_key: str, state_backend: Optional[StateBackend] = None):
         """
         Initialize Hume Provider
 
         Args:
             api_key: Hume API key
             secret_key: Hume Secret key
+            state_backend: Shared state for the rate governor (default: process-local)
         """
         self.api_key = api_key
         self.secret_key = secret_key
@@ -44,10 +85,89 @@ class HumeProvider:
         self.max_poll_attempts = int(os.getenv("HUME_MAX_POLL_ATTEMPTS", 40))
         self.confidence_threshold = float(os.getenv("HUME_CONFIDENCE_THRESHOLD", 0.5))
 
+        # Adaptive polling: first poll near the expected completion time,
+        # then exponential backoff between min and max interval
+        self.poll_min_interval = float(os.getenv("HUME_POLL_MIN_INTERVAL", 1))
+        self.poll_max_interval = float(os.getenv("HUME_POLL_MAX_INTERVAL", 15))
+        self.poll_backoff = float(os.getenv("HUME_POLL_BACKOFF", 1.5))
+        self.poll_timeout = self.poll_interval * self.max_poll_attempts
+        self.turnaround_stats = TurnaroundStats(
+            window=int(os.getenv("HUME_TURNAROUND_WINDOW", 50)),
+            min_samples=int(os.getenv("HUME_TURNAROUND_MIN_SAMPLES", 5))
+        )
+
+        # Circuit breaker / rate governor shared by all tasks in this process
+        self.governor = HumeGovernor(
+            max_rate=float(os.getenv("HUME_MAX_JOBS_PER_SECOND", 5)),
+            min_rate=float(os.getenv("HUME_MIN_JOBS_PER_SECOND", 0.2)),
+            error_threshold=float(os.getenv("HUME_CIRCUIT_ERROR_THRESHOLD", 0.5)),
+            cooldown=float(os.getenv("HUME_CIRCUIT_COOLDOWN", 30)),
+            max_wait=float(os.getenv("HUME_CIRCUIT_MAX_WAIT", 300)),
+            backend=state_backend
+        )
+
+        # Large prediction payloads are parsed in worker processes
+        self.parse_pool = ParsePool(
+            workers=int(os.getenv("PARSE_PROCESS_WORKERS", 2)),
+            threshold=int(os.getenv("PARSE_OFFLOAD_THRESHOLD", 256 * 1024))
+        )
+
+        # Submission time and model configuration per job_id,
+        # used to measure turnaround (popped by wait_for_job, pruned after poll_timeout)
+        self._submitted_at: Dict[str, Tuple[float, Tuple[str, ...]]] = {}
+
+    def build_models_config(
+        self,
+        models: Optional[Sequence[str]] = None,
+        prosody_granularity: Optional[str] = None,
+        language_granularity: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Build the Hume "models" section
+
+        Args:
+            models: Subset of prosody/burst/language (default: all three)
+            prosody_granularity: Prosody granularity (default: utterance)
+            language_granularity: Language granularity (default: sentence)
+
+        Returns:
+            Models configuration for the job request body
+        """
+        models = models or self.DEFAULT_MODELS
+        unknown = set(models) - set(self.DEFAULT_MODELS)
+        if unknown:
+            raise ValueError(f"Unsupported Hume models: {sorted(unknown)}")
+
+        config: Dict[str, Dict[str, Any]] = {}
+        if "prosody" in models:
+            config["prosody"] = {
+                "granularity": prosody_granularity or self.DEFAULT_PROSODY_GRANULARITY,
+                "identify_speakers": False
+            }
+        if "burst" in models:
+            config["burst"] = {}  # Vocal burst detection
+        if "language" in models:
+            config["language"] = {
+                "granularity": language_granularity or self.DEFAULT_LANGUAGE_GRANULARITY,
+                "identify_speakers": False
+            }
+        return config
+
+    @staticmethod
+    def models_key(models_config: Dict[str, Dict[str, Any]]) -> Tuple[str, ...]:
+        """Stable key for a models configuration, e.g. ("burst", "prosody:utterance")"""
+        return tuple(sorted(
+            f"{name}:{options['granularity']}" if options.get("granularity") else name
+            for name, options in models_config.items()
+        ))
+
     async def create_job(
         self,
         audio_url: str,
-        language: str = "ja"
+        language: str = "ja",
+        models: Optional[Sequence[str]] = None,
+        prosody_granularity: Optional[str] = None,
+        language_granularity: Optional[str] = None
     ) -> str:
         """
         Create a new emotion analysis job
@@ -55,50 +175,95 @@ class HumeProvider:
         Args:
             audio_url: Presigned URL for audio file
             language: Language code for transcription
+            models: Hume models to run (default: prosody, burst and language)
+            prosody_granularity: Prosody segmentation (word/sentence/utterance/conversational_turn)
+            language_granularity: Language segmentation (word/sentence/utterance/conversational_turn)
 
         Returns:
             Job ID
         """
-        # Prepare request body with all 3 models
+        return await self.create_batch_job(
+            [audio_url],
+            language=language,
+            models=models,
+            prosody_granularity=prosody_granularity,
+            language_granularity=language_granularity
+        )
+
+    async def create_batch_job(
+        self,
+        audio_urls: List[str],
+        language: str = "ja",
+        models: Optional[Sequence[str]] = None,
+        prosody_granularity: Optional[str] = None,
+        language_granularity: Optional[str] = None
+    ) -> str:
+        """
+        Create one emotion analysis job covering several audio files
+
+        Args:
+            audio_urls: Presigned URLs for audio files
+            language: Language code for transcription
+            models: Hume models to run (default: prosody, burst and language)
+            prosody_granularity: Prosody segmentation
+            language_granularity: Language segmentation
+
+        Returns:
+            Job ID
+        """
+        models_config = self.build_models_config(
+            models, prosody_granularity, language_granularity
+        )
+
+        # Prepare request body with the requested models only
         request_body = {
-            "models": {
-                "prosody": {
-                    "granularity": "utterance",
-                    "identify_speakers": False
-                },
-                "burst": {},  # Vocal burst detection
-                "language": {
-                    "granularity": "sentence",  # sentence-level for better Japanese support
-                    "identify_speakers": False
-                }
-            },
+            "models": models_config,
             "transcription": {
                 "language": language,
                 "confidence_threshold": self.confidence_threshold
             },
-            "urls": [audio_url]
+            "urls": list(audio_urls)
         }
 
-        try:
-            # Make API request
-            response = requests.post(
-                f"{self.base_url}/jobs",
-                headers=self.headers,
-                json=request_body,
-                timeout=30
-            )
-
-            if response.status_code != 200:
-                logger.error(f"Failed to create job: {response.status_code} - {response.text}")
-                raise Exception(f"Hume API error: {response.status_code}")
+        # A throttled submission (429/5xx) goes back into the governor's queue
+        # and is retried until max_wait runs out
+        deadline = time.monotonic() + self.governor.max_wait
+        throttle: Optional[HumeAPIError] = None
 
-            result = response.json()
+        try:
+            while True:
+                # Hold in queue while the circuit is open / rate-limited
+                try:
+                    await self.governor.acquire(deadline)
+                except TimeoutError as e:
+                    if throttle:
+                        raise HumeAPIError(
+                            f"{e} (last response: HTTP {throttle.status_code})",
+                            status_code=throttle.status_code,
+                            retry_after=throttle.retry_after
+                        )
+                    raise HumeAPIError(str(e))
+
+                # Make API request
+                response = await self._send("post", "/jobs", json=request_body, timeout=30)
+                if response.status_code == 200:
+                    break
+
+                error = self._api_error("Hume API error", response)
+                if not error.throttled:
+                    logger.error(f"Failed to create job: {response.status_code} - {response.text}")
+                    raise error
+                logger.warning(f"Hume throttled job submission (HTTP {response.status_code}) - re-queued")
+                throttle = error
+
+            result = json_codec.loads(response.content)
             job_id = result.get("job_id")
 
             if not job_id:
                 raise Exception("No job_id in response")
 
-            logger.info(f"Created Hume job: {job_id}")
+            self._track_submission(job_id, self.models_key(models_config))
+            logger.info(f"Created Hume job: {job_id} (models: {', '.join(models_config)})")
             return job_id
 
         except requests.exceptions.RequestException as e:
@@ -107,7 +272,9 @@ class HumeProvider:
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception(_retryable),
+        reraise=True
     )
     async def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """
@@ -120,101 +287,240 @@ class HumeProvider:
             Job status information
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/jobs/{job_id}",
-                headers=self.headers,
-                timeout=30
-            )
+            await self.governor.wait_if_open()
+            response = await self._send("get", f"/jobs/{job_id}", timeout=30)
 
             if response.status_code != 200:
-                raise Exception(f"Failed to get job status: {response.status_code}")
+                raise self._api_error("Failed to get job status", response)
 
-            return response.json()
+            return json_codec.loads(response.content)
 
         except Exception as e:
             logger.error(f"Failed to get job status: {e}")
             raise
 
+    def _track_submission(self, job_id: str, models: Tuple[str, ...]):
+        """Remember when a job was submitted, dropping entries no wait_for_job will claim"""
+        now = time.monotonic()
+        # Oldest first: a job whose wait never ran (cancelled or crashed
+        # pipeline) is dropped once it is past the polling deadline
+        while self._submitted_at:
+            oldest = next(iter(self._submitted_at))
+            if now - self._submitted_at[oldest][0] <= self.poll_timeout:
+                break
+            del self._submitted_at[oldest]
+        self._submitted_at[job_id] = (now, models)
+
     async def wait_for_job(
         self,
-        job_id: str
-    ) -> Optional[Dict[str, Any]]:
+        job_id: str,
+        audio_duration: Optional[float] = None,
+        timeout: Optional[float] = None,
+        raw: bool = False
+    ) -> Any:
         """
         Poll and wait for job completion
 
+        The first poll is scheduled near the expected completion time learned
+        from recent jobs of similar audio duration; later polls back off
+        exponentially. The recorded turnaround is the midpoint between the
+        last pending poll and the completing one (both timed before the
+        request); a job already complete at the first poll is recorded
+        slightly below that poll so an overestimate can come down.
+
         Args:
             job_id: Hume job ID
+            audio_duration: Audio duration in seconds, if known
+            timeout: Overall deadline in seconds; replaces the poll attempt
+                limit (default: poll_interval * max_poll_attempts)
+            raw: Return predictions as undecoded response bytes
 
         Returns:
             Job results or None if failed
         """
+        # Jobs resumed after a restart were not submitted here - no turnaround sample
+        tracked = self._submitted_at.pop(job_id, None)
+        submitted_at, models = tracked or (
+            time.monotonic(), self.models_key(self.build_models_config())
+        )
+
+        expected = self.turnaround_stats.estimate(audio_duration, models)
+        if expected is None:
+            first_delay = self.poll_interval
+        else:
+            first_delay = expected - (time.monotonic() - submitted_at)
+
+        delays = poll_delays(
+            first_delay,
+            self.poll_min_interval,
+            self.poll_max_interval,
+            self.poll_backoff
+        )
+        deadline = submitted_at + (timeout or self.poll_timeout)
+        max_attempts = self.max_poll_attempts if timeout is None else None
         attempts = 0
+        last_pending: Optional[float] = None
+
+        while max_attempts is None or attempts < max_attempts:
+            delay = next(delays)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            attempts += 1
 
-        while attempts < self.max_poll_attempts:
             try:
                 # Get job status
+                polled_at = time.monotonic()
                 status_response = await self.get_job_status(job_id)
                 state = status_response.get("state", {})
                 status = state.get("status")
 
-                logger.info(f"Job {job_id} status: {status} (attempt {attempts + 1})")
+                logger.info(f"Job {job_id} status: {status} (attempt {attempts})")
 
                 if status == "COMPLETED":
+                    # Completed somewhere between the last pending poll and this one
+                    upper = polled_at - submitted_at
+                    if last_pending is None:
+                        lower = max(0.0, upper - self.poll_min_interval)
+                    else:
+                        lower = last_pending - submitted_at
+                    elapsed = (lower + upper) / 2
+                    if tracked:
+                        self.turnaround_stats.record(audio_duration, models, elapsed)
+                    logger.info(
+                        f"Job {job_id} completed in {elapsed:.1f}s "
+                        f"(expected {expected or 0:.1f}s, {attempts} polls)"
+                    )
+
                     # Get predictions
-                    return await self.get_job_predictions(job_id)
+                    return await self.get_job_predictions(job_id, raw=raw)
 
                 elif status == "FAILED":
                     logger.error(f"Job {job_id} failed")
                     return None
 
-                # Wait before next poll
-                await asyncio.sleep(self.poll_interval)
-                attempts += 1
+                last_pending = polled_at
 
             except Exception as e:
                 logger.error(f"Error polling job {job_id}: {e}")
-                attempts += 1
-                await asyncio.sleep(self.poll_interval)
 
         logger.error(f"Job {job_id} timed out after {attempts} attempts")
         return None
 
-    async def get_job_predictions(self, job_id: str) -> Dict[str, Any]:
+    async def get_job_predictions(self, job_id: str, raw: bool = False) -> Any:
         """
         Get job predictions/results
 
         Args:
             job_id: Hume job ID
+            raw: Return the undecoded response bytes (for parse_results offload)
 
         Returns:
             Prediction results
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/jobs/{job_id}/predictions",
-                headers=self.headers,
+            await self.governor.wait_if_open()
+            response = await self._send(
+                "get",
+                f"/jobs/{job_id}/predictions",
                 timeout=60  # Longer timeout for large results
             )
 
             if response.status_code != 200:
-                raise Exception(f"Failed to get predictions: {response.status_code}")
+                raise self._api_error("Failed to get predictions", response)
 
-            return response.json()
+            # Decode once, straight from the response bytes
+            return response.content if raw else json_codec.loads(response.content)
 
         except Exception as e:
             logger.error(f"Failed to get predictions: {e}")
             raise
 
-    async def parse_results(self, raw_results: Any) -> Optional[Dict[str, Any]]:
+    async def _send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request to Hume and report the outcome to the governor"""
+        try:
+            # Run the blocking client in a thread so large downloads don't stall the loop
+            response = await asyncio.to_thread(
+                requests.request,
+                method,
+                f"{self.base_url}{path}",
+                headers=self.headers,
+                **kwargs
+            )
+        except requests.exceptions.RequestException:
+            await self.governor.record_failure()
+            raise
+
+        if is_throttle_status(response.status_code):
+            await self.governor.record_failure(
+                response.status_code,
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+        else:
+            await self.governor.record_success()
+
+        return response
+
+    def _api_error(self, message: str, response: requests.Response) -> HumeAPIError:
+        """Build a HumeAPIError from a non-200 response"""
+        return HumeAPIError(
+            f"{message}: {response.status_code}",
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("Retry-After"))
+        )
+
+    @staticmethod
+    def split_predictions(raw_results: Any) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Split a multi-URL job response per source URL
+
+        Args:
+            raw_results: Raw predictions response of a batch job
+
+        Returns:
+            Mapping of source URL to a single-source response, which can be
+            passed to parse_results as-is
+        """
+        split: Dict[str, List[Dict[str, Any]]] = {}
+        if not isinstance(raw_results, list):
+            return split
+
+        for entry in raw_results:
+            url = (entry.get("source") or {}).get("url")
+            if url:
+                split.setdefault(url, []).append(entry)
+        return split
+
+    async def parse_results(
+        self,
+        raw_results: Any,
+        models: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Parse Hume API results into structured format
 
+        Raw response bytes (see get_job_predictions(raw=True)) above the
+        offload threshold are decoded and parsed in the parse process pool
+        so the event loop stays responsive.
+
         Args:
-            raw_results: Raw API response
+            raw_results: Raw API response (decoded JSON or response bytes)
+            models: Models to parse (default: every model present in the response)
 
         Returns:
             Parsed emotion data or None if no valid data
         """
+        if isinstance(raw_results, (bytes, bytearray)):
+            return await self.parse_pool.parse(bytes(raw_results), models)
+        return self.parse_predictions(raw_results, models)
+
+    @staticmethod
+    def parse_predictions(
+        raw_results: Any,
+        models: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Synchronous parser behind parse_results (safe to run in a worker process)"""
         try:
             # Navigate to predictions
             if not raw_results or not isinstance(raw_results, list):
@@ -229,7 +535,11 @@ class HumeProvider:
                 return None
 
             first_prediction = predictions[0]
-            models = first_prediction.get("models", {})
+            model_results = first_prediction.get("models", {})
+            if models:
+                model_results = {
+                    name: data for name, data in model_results.items() if name in models
+                }
 
             # Initialize result structure
             parsed = {
@@ -241,9 +551,9 @@ class HumeProvider:
             }
 
             # Parse Speech Prosody results
-            prosody = models.get("prosody", {})
+            prosody = model_results.get("prosody", {})
             if prosody:
-                parsed["speech_prosody"] = self._parse_prosody(prosody)
+                parsed["speech_prosody"] = HumeProvider._parse_prosody(prosody)
                 parsed["total_segments"] += parsed["speech_prosody"].get("total_segments", 0)
 
                 # Extract metadata
@@ -252,15 +562,15 @@ class HumeProvider:
                 parsed["detected_language"] = metadata.get("detected_language")
 
             # Parse Vocal Burst results
-            burst = models.get("burst", {})
+            burst = model_results.get("burst", {})
             if burst:
-                parsed["vocal_burst"] = self._parse_burst(burst)
+                parsed["vocal_burst"] = HumeProvider._parse_burst(burst)
                 parsed["total_segments"] += parsed["vocal_burst"].get("total_segments", 0)
 
             # Parse Language results
-            language = models.get("language", {})
+            language = model_results.get("language", {})
             if language:
-                parsed["language"] = self._parse_language(language)
+                parsed["language"] = HumeProvider._parse_language(language)
                 parsed["total_segments"] += parsed["language"].get("total_segments", 0)
 
             # Check if we got any valid data
@@ -268,13 +578,19 @@ class HumeProvider:
                 logger.warning("No emotion segments extracted")
                 return None
 
+            # Fused timeline: bursts and sentences aligned to prosody utterances
+            timeline = build_timeline(parsed)
+            if timeline:
+                parsed["timeline"] = timeline
+
             return parsed
 
         except Exception as e:
             logger.error(f"Failed to parse results: {e}")
             return None
 
-    def _parse_prosody(self, prosody_data: Dict) -> Dict:
+    @staticmethod
+    def _parse_prosody(prosody_data: Dict) -> Dict:
         """Parse speech prosody results"""
         result = {
             "total_segments": 0,
@@ -317,7 +633,8 @@ class HumeProvider:
         result["total_segments"] = len(result["segments"])
         return result
 
-    def _parse_burst(self, burst_data: Dict) -> Dict:
+    @staticmethod
+    def _parse_burst(burst_data: Dict) -> Dict:
         """Parse vocal burst results"""
         result = {
             "total_segments": 0,
@@ -358,7 +675,8 @@ class HumeProvider:
         result["total_segments"] = len(result["segments"])
         return result
 
-    def _parse_language(self, language_data: Dict) -> Dict:
+    @staticmethod
+    def _parse_language(language_data: Dict) -> Dict:
         """Parse language emotion results"""
         result = {
             "total_segments": 0,
@@ -378,6 +696,9 @@ class HumeProvider:
                 "position": pred.get("position", {}),  # Text position instead of time
                 "emotions": {}
             }
+            # Audio inputs also carry the sentence time range
+            if pred.get("time"):
+                segment["time"] = pred["time"]
 
             # Extract emotion scores
             emotions = pred.get("emotions", [])
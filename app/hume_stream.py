@@ -0,0 +1,212 @@
+"""
+Hume AI Streaming
+Relays audio chunks to the Hume streaming API over pooled WebSocket connections
+"""
+
+import base64
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import ConnectionClosed
+from websockets.protocol import State
+
+from app import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM_URL = "wss://api.hume.ai/v0/stream/models"
+
+# Models available on the streaming API for audio
+STREAM_MODELS = ("prosody", "burst")
+
+
+class HumeStreamConnection:
+    """A leased upstream connection; the first message resets Hume's stream context"""
+
+    def __init__(self, pool: "HumeStreamPool", websocket: ClientConnection):
+        self._pool = pool
+        self.websocket = websocket
+        self._reset = True
+
+    async def predict(self, audio: bytes) -> Dict[str, Any]:
+        """
+        Send one audio chunk and wait for its predictions
+
+        Args:
+            audio: Audio chunk (Hume accepts up to 5 seconds per message)
+
+        Returns:
+            Raw streaming response ({"prosody": {...}, "burst": {...}} or {"error": ...})
+        """
+        try:
+            await self.websocket.send(self._message(audio, self._reset))
+            response = await self.websocket.recv()
+        except ConnectionClosed:
+            # Hume drops idle connections; reconnect once and resend with a fresh context
+            logger.info("Hume stream connection closed - reconnecting")
+            self.websocket = await self._pool.open()
+            await self.websocket.send(self._message(audio, True))
+            response = await self.websocket.recv()
+
+        self._reset = False
+        return json_codec.loads(response)
+
+    def _message(self, audio: bytes, reset: bool) -> str:
+        return json_codec.dumps_str({
+            "models": {name: {} for name in self._pool.models},
+            "data": base64.b64encode(audio).decode("ascii"),
+            "reset_stream": reset
+        })
+
+
+class HumeStreamPool:
+    """Pool of warm upstream WebSocket connections to the Hume streaming API"""
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = DEFAULT_STREAM_URL,
+        size: int = 4,
+        models: Sequence[str] = STREAM_MODELS
+    ):
+        """
+        Initialize stream pool
+
+        Args:
+            api_key: Hume API key
+            url: Streaming endpoint (a local fake server can be used for testing)
+            size: Maximum concurrent upstream connections
+            models: Models requested for every chunk
+        """
+        self.api_key = api_key
+        self.url = url
+        self.size = size
+        self.models = tuple(models)
+        self._idle: List[ClientConnection] = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def open(self) -> ClientConnection:
+        """Open a new upstream connection"""
+        return await connect(
+            self.url,
+            additional_headers={"X-Hume-Api-Key": self.api_key},
+            max_size=None
+        )
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[HumeStreamConnection]:
+        """Lease a connection for one client session; waits if the pool is exhausted"""
+        async with self._semaphore:
+            websocket = None
+            while self._idle and websocket is None:
+                candidate = self._idle.pop()
+                if candidate.state is State.OPEN:
+                    websocket = candidate
+            if websocket is None:
+                websocket = await self.open()
+
+            leased = HumeStreamConnection(self, websocket)
+            try:
+                yield leased
+            except BaseException:
+                await leased.websocket.close()
+                raise
+            else:
+                self._idle.append(leased.websocket)
+
+    async def close(self):
+        """Close all idle connections"""
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class StreamSession:
+    """Accumulates per-chunk predictions of one client session"""
+
+    def __init__(self, hume_provider, chunk_seconds: Optional[float] = None):
+        """
+        Initialize session
+
+        Args:
+            hume_provider: HumeProvider, whose segment parsers are reused
+            chunk_seconds: Fixed chunk length sent by the client; if omitted,
+                offsets follow the end time of the previous chunk's predictions
+        """
+        self.hume_provider = hume_provider
+        self.chunk_seconds = chunk_seconds
+        self.chunks = 0
+        self.offset = 0.0
+        self.speech_prosody: List[Dict[str, Any]] = []
+        self.vocal_burst: List[Dict[str, Any]] = []
+
+    def add(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parse one streaming response
+
+        Args:
+            response: Raw Hume streaming response for the chunk
+
+        Returns:
+            Message for the client with segments shaped like _parse_prosody output
+        """
+        chunk = self.chunks
+        offset = self.offset
+        self.chunks += 1
+
+        if response.get("error"):
+            self._advance(offset, [])
+            return {"type": "error", "chunk": chunk, "error": response["error"], "code": response.get("code")}
+
+        message: Dict[str, Any] = {"type": "chunk", "chunk": chunk, "offset": offset}
+        segments: List[Dict[str, Any]] = []
+
+        for model, key, parser, accumulated in (
+            ("prosody", "speech_prosody", self.hume_provider._parse_prosody, self.speech_prosody),
+            ("burst", "vocal_burst", self.hume_provider._parse_burst, self.vocal_burst),
+        ):
+            predictions = (response.get(model) or {}).get("predictions") or []
+            parsed = parser({"grouped_predictions": [{"predictions": predictions}]})
+
+            for segment in parsed["segments"]:
+                time_range = segment.get("time") or {}
+                segment["time"] = {
+                    "begin": offset + (time_range.get("begin") or 0.0),
+                    "end": offset + (time_range.get("end") or 0.0)
+                }
+                segment["segment_id"] = len(accumulated) + 1
+                accumulated.append(segment)
+
+            message[key] = parsed
+            segments.extend(parsed["segments"])
+
+        self._advance(offset, segments)
+        return message
+
+    def result(self) -> Dict[str, Any]:
+        """Session result in the same shape as HumeProvider.parse_results"""
+        return {
+            "provider": "hume",
+            "version": "3.0.0",
+            "mode": "stream",
+            "timestamp": datetime.utcnow().isoformat(),
+            "chunks": self.chunks,
+            "total_segments": len(self.speech_prosody) + len(self.vocal_burst),
+            "speech_prosody": {
+                "total_segments": len(self.speech_prosody),
+                "segments": self.speech_prosody
+            },
+            "vocal_burst": {
+                "total_segments": len(self.vocal_burst),
+                "segments": self.vocal_burst
+            }
+        }
+
+    def _advance(self, offset: float, segments: List[Dict[str, Any]]):
+        if self.chunk_seconds:
+            self.offset = offset + self.chunk_seconds
+        else:
+            self.offset = max([offset] + [segment["time"]["end"] for segment in segments])
@@ -0,0 +1,195 @@
+"""
+Job registry
+Tracks in-flight emotion analysis jobs so status can be served without the database
+"""
+
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app import json_codec
+from app.state_backend import MemoryBackend, StateBackend
+
+Key = Tuple[str, str]
+
+FINAL_STATUSES = ("completed", "failed")
+
+
+class JobRegistry:
+    """
+    Stage, Hume job_id, timings and attempts per (device_id, recorded_at)
+
+    Entries live in a StateBackend so every worker sees the same jobs;
+    finished entries expire after the TTL, unfinished ones (including jobs
+    interrupted by a shutdown, or lost with a crashed worker) after
+    marker_ttl, like their job marker. The registry also holds the
+    in-flight claims used to deduplicate concurrent submissions and the
+    job markers read by the stuck-job reaper.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StateBackend] = None,
+        ttl: float = 3600.0,
+        lock_ttl: float = 900.0,
+        marker_ttl: float = 7 * 86400.0
+    ):
+        """
+        Initialize registry
+
+        Args:
+            backend: Shared state backend (default: process-local memory)
+            ttl: Seconds a finished entry is kept before eviction
+            lock_ttl: Seconds an in-flight claim is held if never released or refreshed
+            marker_ttl: Seconds a job marker (and an unfinished entry) is kept if the job never finishes
+        """
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.marker_ttl = marker_ttl
+
+    @staticmethod
+    def _key(device_id: str, recorded_at: str) -> str:
+        return f"job:{device_id}|{recorded_at}"
+
+    async def claim(self, device_id: str, recorded_at: str, owner: str = "") -> bool:
+        """
+        Claim a recording for processing
+
+        Returns:
+            False if another request (on any worker) is already processing it
+        """
+        return await self.backend.set_if_absent(
+            f"inflight:{device_id}|{recorded_at}", owner or "1", ttl=self.lock_ttl
+        )
+
+    async def release(self, device_id: str, recorded_at: str):
+        """Release an in-flight claim"""
+        await self.backend.delete(f"inflight:{device_id}|{recorded_at}")
+
+    async def keep_claim(self, device_id: str, recorded_at: str, owner: str = ""):
+        """
+        Refresh an in-flight claim until cancelled
+
+        Run alongside a pipeline so a job that waits longer than lock_ttl
+        (scheduler queue, slow Hume job) never loses its claim.
+        """
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            await self.backend.set(
+                f"inflight:{device_id}|{recorded_at}", owner or "1", ttl=self.lock_ttl
+            )
+
+    @staticmethod
+    def _marker_key(device_id: str, recorded_at: str) -> str:
+        return f"marker:{device_id}|{recorded_at}"
+
+    async def set_marker(self, device_id: str, recorded_at: str, marker: Dict[str, Any]):
+        """
+        Store the job marker of a recording
+
+        The marker (file_path, options, started_at and the Hume job_id once
+        submitted) is kept until the final result is saved, so the stuck-job
+        reaper can resume or recover the job.
+        """
+        await self.backend.set(
+            self._marker_key(device_id, recorded_at), json_codec.dumps_str(marker), ttl=self.marker_ttl
+        )
+
+    async def get_marker(self, device_id: str, recorded_at: str) -> Optional[Dict[str, Any]]:
+        """Job marker of a recording, or None"""
+        raw = await self.backend.get(self._marker_key(device_id, recorded_at))
+        return json_codec.loads(raw) if raw else None
+
+    async def clear_marker(self, device_id: str, recorded_at: str):
+        """Drop the job marker once the final result is saved"""
+        await self.backend.delete(self._marker_key(device_id, recorded_at))
+
+    async def start(self, device_id: str, recorded_at: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+        """Register a new (or retried) job and return its entry"""
+        previous = await self.get(device_id, recorded_at)
+        now = datetime.utcnow().isoformat()
+        entry = {
+            "device_id": device_id,
+            "recorded_at": recorded_at,
+            "file_path": file_path,
+            "status": "processing",
+            "stage": "queued",
+            "job_id": None,
+            "attempts": (previous["attempts"] if previous else 0) + 1,
+            "started_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "timings": {"queued": 0.0},
+            "error": None,
+            "started": time.time()
+        }
+        await self.backend.set(
+            self._key(device_id, recorded_at), json_codec.dumps_str(entry), ttl=self.marker_ttl
+        )
+        return self._public(entry)
+
+    async def update(self, device_id: str, recorded_at: str, stage: str, details: Optional[Dict[str, Any]] = None):
+        """
+        Record a pipeline stage
+
+        Args:
+            device_id: Device identifier
+            recorded_at: Recording timestamp
+            stage: Stage name reported by the pipeline
+            details: Stage details (job_id, error, status, ...)
+        """
+        details = details or {}
+        key = self._key(device_id, recorded_at)
+        raw = await self.backend.get(key)
+        if raw is None:
+            return
+
+        entry = json_codec.loads(raw)
+        entry["stage"] = stage
+        entry["updated_at"] = datetime.utcnow().isoformat()
+        entry["timings"][stage] = round(time.time() - entry["started"], 3)
+        if details.get("job_id"):
+            entry["job_id"] = details["job_id"]
+        if details.get("error"):
+            entry["error"] = details["error"]
+
+        ttl = self.marker_ttl
+        if stage in ("failed", "saved"):
+            entry["status"] = "failed" if stage == "failed" else details.get("status", "completed")
+            entry["finished_at"] = entry["updated_at"]
+            ttl = self.ttl
+
+        await self.backend.set(key, json_codec.dumps_str(entry), ttl=ttl)
+
+    async def get(self, device_id: str, recorded_at: str) -> Optional[Dict[str, Any]]:
+        """Status of one job, or None if unknown/evicted"""
+        raw = await self.backend.get(self._key(device_id, recorded_at))
+        return self._public(json_codec.loads(raw)) if raw else None
+
+    async def get_many(self, keys: Iterable[Key]) -> List[Optional[Dict[str, Any]]]:
+        """Status of several jobs, None for unknown ones"""
+        values = await self.backend.mget([self._key(*key) for key in keys])
+        return [self._public(json_codec.loads(raw)) if raw else None for raw in values]
+
+    async def list_jobs(self, device_id: Optional[str] = None, in_flight_only: bool = False) -> List[Dict[str, Any]]:
+        """All known jobs, optionally filtered by device / in-flight status"""
+        pattern = f"job:{device_id}|*" if device_id else "job:*"
+        keys = await self.backend.keys(pattern)
+        entries = [
+            self._public(json_codec.loads(raw))
+            for raw in await self.backend.mget(keys) if raw
+        ]
+        return [
+            entry for entry in entries
+            if not (in_flight_only and entry["status"] in FINAL_STATUSES)
+        ]
+
+    async def in_flight(self) -> int:
+        """Number of jobs not yet finished"""
+        return len(await self.list_jobs(in_flight_only=True))
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != "started"}
@@ -0,0 +1,86 @@
+"""
+JSON codec
+Fast JSON backend (orjson) with a stdlib fallback, shared by every JSON path:
+Hume predictions, Supabase writes, SQS messages and streamed results
+"""
+
+import os
+import json
+import logging
+from typing import Any, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _default(obj: Any) -> Any:
+    """Serialize NumPy arrays/scalars (score vectors) for the stdlib backend"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _StdlibBackend:
+    name = "stdlib"
+
+    @staticmethod
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+    @staticmethod
+    def dumps_str(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=_default)
+
+
+class _OrjsonBackend:
+    name = "orjson"
+
+    def __init__(self, orjson):
+        self._orjson = orjson
+        self._options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        # orjson decodes bytes directly, without an intermediate str
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, default=_default, option=self._options)
+
+    def dumps_str(self, obj: Any) -> str:
+        return self.dumps(obj).decode("utf-8")
+
+
+def _load_backend(name: str):
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return _OrjsonBackend(orjson)
+        except ImportError:
+            if name == "orjson":
+                logger.warning("JSON_BACKEND=orjson but orjson is not installed - using stdlib json")
+    return _StdlibBackend()
+
+
+backend = _load_backend(os.getenv("JSON_BACKEND", "auto"))
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode JSON, preferably straight from response bytes"""
+    return backend.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to UTF-8 JSON bytes (NumPy arrays become lists)"""
+    return backend.dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode to a JSON string (NumPy arrays become lists)"""
+    return backend.dumps_str(obj)
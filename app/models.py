@@ -2,10 +2,12 @@
 Pydantic models for Hume AI Emotion Recognition API
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime
 
+from app.scheduler import DEFAULT_PRIORITY
+
 
 class HealthResponse(BaseModel):
     """Health check response"""
@@ -15,6 +17,20 @@ class HealthResponse(BaseModel):
     provider_loaded: bool = Field(description="Hume provider status")
     supabase_connected: bool = Field(description="Database connection status")
     aws_connected: bool = Field(description="AWS services status")
+    hume_circuit: Optional[Dict[str, Any]] = Field(None, description="Hume circuit breaker / rate governor state")
+    scheduler: Optional[Dict[str, Any]] = Field(None, description="Job scheduler slots and queues")
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response"""
+    ready: bool = Field(description="Whether the instance should receive traffic")
+    checks: Dict[str, bool] = Field(description="Initialization state per dependency")
+    startup_seconds: Optional[float] = Field(None, description="Time taken by background initialization")
+
+
+HumeModel = Literal["prosody", "burst", "language"]
+Granularity = Literal["word", "sentence", "utterance", "conversational_turn"]
+Priority = Literal["live", "normal", "bulk"]
 
 
 class AsyncProcessRequest(BaseModel):
@@ -22,6 +38,30 @@ class AsyncProcessRequest(BaseModel):
     file_path: str = Field(description="S3 file path")
     device_id: str = Field(description="Device identifier")
     recorded_at: str = Field(description="Recording timestamp")
+    models: Optional[List[HumeModel]] = Field(
+        None,
+        min_length=1,
+        description="Hume models to run (default: prosody, burst, language)"
+    )
+    prosody_granularity: Optional[Granularity] = Field(
+        None, description="Prosody segmentation (default: utterance)"
+    )
+    language_granularity: Optional[Granularity] = Field(
+        None, description="Language segmentation (default: sentence)"
+    )
+    priority: Priority = Field(
+        DEFAULT_PRIORITY, description="Scheduling class: live recordings, normal, or bulk (backfills, re-runs)"
+    )
+    tenant_id: Optional[str] = Field(
+        None, description="Tenant for concurrency quotas (default: the device)"
+    )
+
+
+class ProcessRequest(AsyncProcessRequest):
+    """Synchronous (streaming) processing request"""
+    timeout: Optional[float] = Field(
+        None, gt=0, description="Server-side timeout in seconds (capped by PROCESS_TIMEOUT)"
+    )
 
 
 class AsyncProcessResponse(BaseModel):
@@ -32,6 +72,75 @@ class AsyncProcessResponse(BaseModel):
     recorded_at: str = Field(description="Recording timestamp")
 
 
+class JobStatus(BaseModel):
+    """In-memory status of an emotion analysis job"""
+    device_id: str = Field(description="Device identifier")
+    recorded_at: str = Field(description="Recording timestamp")
+    file_path: Optional[str] = Field(None, description="S3 file path")
+    status: str = Field(description="Processing status (processing, completed, failed)")
+    stage: str = Field(description="Last pipeline stage")
+    job_id: Optional[str] = Field(None, description="Hume job ID")
+    attempts: int = Field(description="Times this recording was submitted")
+    started_at: str = Field(description="Start timestamp")
+    updated_at: str = Field(description="Last update timestamp")
+    finished_at: Optional[str] = Field(None, description="Finish timestamp")
+    timings: Dict[str, float] = Field(description="Seconds from start at which each stage was reached")
+    error: Optional[str] = Field(None, description="Error message if failed")
+
+
+class JobKey(BaseModel):
+    """Job identifier"""
+    device_id: str = Field(description="Device identifier")
+    recorded_at: str = Field(description="Recording timestamp")
+
+
+class JobStatusBulkRequest(BaseModel):
+    """Bulk job status request"""
+    jobs: Optional[List[JobKey]] = Field(None, description="Jobs to look up (default: all in-flight jobs)")
+    device_id: Optional[str] = Field(None, description="Filter in-flight jobs by device")
+
+
+class JobStatusBulkResponse(BaseModel):
+    """Bulk job status response"""
+    jobs: List[JobStatus] = Field(description="Known jobs")
+    missing: List[JobKey] = Field(default_factory=list, description="Requested jobs not in the registry")
+    in_flight: int = Field(description="Jobs currently in flight")
+
+
+EmotionSpace = Literal["prosody", "language"]
+
+
+class SimilarityRequest(BaseModel):
+    """Similarity search request - by example segment or by emotion scores"""
+    space: EmotionSpace = Field("prosody", description="Vector space (prosody: 48 emotions, language: 53)")
+    device_id: Optional[str] = Field(None, description="Example segment: device identifier")
+    recorded_at: Optional[str] = Field(None, description="Example segment: recording timestamp")
+    segment_id: Optional[int] = Field(None, description="Example segment: segment_id in the stored result")
+    emotions: Optional[Dict[str, float]] = Field(None, description="Emotion scores to search for instead of an example")
+    k: int = Field(10, ge=1, le=100, description="Number of matches")
+    filter_device_id: Optional[str] = Field(None, description="Only search this device")
+    include_same_recording: bool = Field(False, description="Include segments of the example's own recording")
+
+
+class SimilarSegment(BaseModel):
+    """Segment matched by similarity search"""
+    device_id: str = Field(description="Device identifier")
+    recorded_at: str = Field(description="Recording timestamp")
+    segment_id: Optional[int] = Field(None, description="Segment ID in the stored result")
+    score: float = Field(description="Cosine similarity")
+    time: Optional[Dict[str, Any]] = Field(None, description="Time range (prosody) or text position (language)")
+    text: Optional[str] = Field(None, description="Transcribed text")
+    dominant_emotion: Optional[str] = Field(None, description="Dominant emotion of the segment")
+
+
+class SimilarityResponse(BaseModel):
+    """Similarity search response"""
+    space: EmotionSpace = Field(description="Vector space searched")
+    matches: List[SimilarSegment] = Field(description="Most similar segments, best first")
+    searched: int = Field(description="Segments compared")
+    took_ms: float = Field(description="Search time in milliseconds")
+
+
 class ErrorResponse(BaseModel):
     """Error response"""
     error: str = Field(description="Error message")
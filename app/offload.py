@@ -0,0 +1,91 @@
+"""
+Process-pool offload for CPU-heavy parsing
+Keeps the event loop responsive while large Hume results are decoded and parsed
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Sequence
+
+from app import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+def parse_payload(payload: bytes, models: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Decode and parse a raw predictions payload
+
+    Runs in a worker process; the payload crosses the process boundary as
+    bytes instead of a pickled nested dict.
+    """
+    # Imported here to avoid a circular import with app.hume_provider
+    from app.hume_provider import HumeProvider
+
+    try:
+        raw_results = json_codec.loads(payload)
+    except ValueError as e:
+        logger.error(f"Failed to decode predictions payload: {e}")
+        return None
+
+    return HumeProvider.parse_predictions(raw_results, models)
+
+
+class ParsePool:
+    """Lazily started process pool used for payloads above a size threshold"""
+
+    def __init__(self, workers: int = 2, threshold: int = 256 * 1024):
+        """
+        Initialize parse pool
+
+        Args:
+            workers: Worker processes (0 parses everything in-process)
+            threshold: Payload size in bytes from which parsing is offloaded
+        """
+        self.workers = workers
+        self.threshold = threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: don't fork an event loop, threads and open sockets into workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started parse process pool with {self.workers} workers")
+        return self._executor
+
+    async def parse(self, payload: bytes, models: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Parse a raw predictions payload, offloading large ones
+
+        Args:
+            payload: Undecoded predictions response body
+            models: Models to parse (default: all present)
+
+        Returns:
+            Parsed emotion data or None if no valid data
+        """
+        if self.workers <= 0 or len(payload) < self.threshold:
+            return parse_payload(payload, models)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, parse_payload, payload, tuple(models) if models else None
+            )
+        except Exception as e:
+            # BrokenProcessPool etc. - fall back to parsing in-process
+            logger.error(f"Parse offload failed, parsing in-process: {e}")
+            self.shutdown()
+            return parse_payload(payload, models)
+
+    def shutdown(self):
+        """Stop worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
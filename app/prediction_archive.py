@@ -0,0 +1,217 @@
+"""
+Raw prediction archive
+Append-only, compressed store of Hume prediction payloads for re-parsing without Hume
+"""
+
+import os
+import mmap
+import time
+import zlib
+import fcntl
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionArchive:
+    """
+    Raw Hume predictions in compressed segment files
+
+    Each payload is zlib-compressed and appended to the current segment file
+    (raw-000001.seg, ...; a new one is started past segment_bytes). index.jsonl
+    records job_id, device_id, recorded_at, models, segment, offset and length
+    per payload and is loaded into lookups by job_id and by
+    (device_id, recorded_at). Segments are memory-mapped for reads. Appends
+    are serialized with a file lock so several workers can share a directory.
+    """
+
+    INDEX_FILE = "index.jsonl"
+    LOCK_FILE = "archive.lock"
+
+    def __init__(self, directory: str, segment_bytes: int = 256 * 1024 * 1024, level: int = 6):
+        """
+        Initialize archive
+
+        Args:
+            directory: Archive directory
+            segment_bytes: Size after which a new segment file is started
+            level: zlib compression level
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.level = level
+
+        self._entries: List[Dict[str, Any]] = []
+        self._by_job: Dict[str, List[int]] = {}
+        self._by_recording: Dict[Tuple[str, str], int] = {}
+        self._index_offset = 0
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._lock = threading.Lock()
+
+        self.refresh()
+        logger.info(f"Prediction archive at {directory}: {len(self._entries)} payloads")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, self.INDEX_FILE)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"raw-{segment:06d}.seg")
+
+    async def append(
+        self,
+        payload: bytes,
+        job_id: Optional[str],
+        device_id: str,
+        recorded_at: str,
+        models: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """Archive one raw prediction payload (JSON bytes); returns its index entry"""
+        return await asyncio.to_thread(self.append_sync, payload, job_id, device_id, recorded_at, models)
+
+    def append_sync(
+        self,
+        payload: bytes,
+        job_id: Optional[str],
+        device_id: str,
+        recorded_at: str,
+        models: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        compressed = zlib.compress(payload, self.level)
+
+        with open(os.path.join(self.directory, self.LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                segment = self._current_segment()
+                path = self._segment_path(segment)
+                if os.path.exists(path) and os.path.getsize(path) + len(compressed) > self.segment_bytes:
+                    segment += 1
+                    path = self._segment_path(segment)
+
+                with open(path, "ab") as f:
+                    offset = f.tell()
+                    f.write(compressed)
+
+                entry = {
+                    "job_id": job_id,
+                    "device_id": device_id,
+                    "recorded_at": recorded_at,
+                    "models": list(models) if models else None,
+                    "segment": segment,
+                    "offset": offset,
+                    "length": len(compressed),
+                    "raw_length": len(payload),
+                    "archived_at": time.time()
+                }
+                # The index line is written last: a payload is visible once complete
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    f.write(json_codec.dumps_str(entry) + "\n")
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        return entry
+
+    def _current_segment(self) -> int:
+        segments = [
+            int(name[4:10]) for name in os.listdir(self.directory)
+            if name.startswith("raw-") and name.endswith(".seg")
+        ]
+        return max(segments, default=1)
+
+    def refresh(self):
+        """Load index entries appended since the last refresh (by any process)"""
+        with self._lock:
+            if not os.path.exists(self.index_path):
+                return
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_offset)
+                chunk = f.read()
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            self._index_offset += len(complete)
+
+            for line in complete.splitlines():
+                entry = json_codec.loads(line)
+                position = len(self._entries)
+                self._entries.append(entry)
+                if entry.get("job_id"):
+                    self._by_job.setdefault(entry["job_id"], []).append(position)
+                # Latest payload wins for a recording
+                self._by_recording[(entry["device_id"], entry["recorded_at"])] = position
+
+    def read(self, entry: Dict[str, Any]) -> bytes:
+        """Decompressed payload of an index entry"""
+        start, end = entry["offset"], entry["offset"] + entry["length"]
+        with self._lock:
+            mapped = self._maps.get(entry["segment"])
+            if mapped is None or len(mapped) < end:
+                # Segment grew (or first read): remap
+                if mapped is not None:
+                    mapped.close()
+                with open(self._segment_path(entry["segment"]), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[entry["segment"]] = mapped
+            data = mapped[start:end]
+        return zlib.decompress(data)
+
+    def by_job(self, job_id: str) -> List[Dict[str, Any]]:
+        """Entries archived for a Hume job (several for multi-URL jobs)"""
+        self.refresh()
+        return [self._entries[i] for i in self._by_job.get(job_id, [])]
+
+    def by_recording(self, device_id: str, recorded_at: str) -> Optional[Dict[str, Any]]:
+        """Latest entry archived for a recording"""
+        self.refresh()
+        position = self._by_recording.get((device_id, recorded_at))
+        return self._entries[position] if position is not None else None
+
+    def latest(
+        self,
+        device_ids: Optional[Sequence[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Latest entry per recording, in archive order
+
+        Args:
+            device_ids: Only these devices
+            start: Inclusive lower bound for recorded_at (string comparison)
+            end: Exclusive upper bound for recorded_at
+        """
+        self.refresh()
+        for (device_id, recorded_at), position in sorted(self._by_recording.items(), key=lambda item: item[1]):
+            if device_ids and device_id not in device_ids:
+                continue
+            if (start and recorded_at < start) or (end and recorded_at >= end):
+                continue
+            yield self._entries[position]
+
+    def close(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+def create_prediction_archive(path: Optional[str] = None) -> Optional[PredictionArchive]:
+    """
+    Create the archive configured by PREDICTION_ARCHIVE_PATH
+
+    Args:
+        path: Archive directory ("" disables archiving, the default)
+
+    Returns:
+        Archive instance, or None if disabled
+    """
+    path = os.getenv("PREDICTION_ARCHIVE_PATH", "") if path is None else path
+    if not path:
+        return None
+
+    segment_mb = int(os.getenv("PREDICTION_ARCHIVE_SEGMENT_MB", 256))
+    return PredictionArchive(path, segment_bytes=segment_mb * 1024 * 1024)
@@ -0,0 +1,242 @@
+"""
+Stuck-job reaper
+Recovers spot_features rows left in emotion_status = processing
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.hume_provider import HumeAPIError, HumeProvider
+from app.job_registry import JobRegistry
+from app.prediction_archive import PredictionArchive
+
+logger = logging.getLogger(__name__)
+
+# Re-queue a claimed job spec (file_path, device_id, recorded_at, options, job_id)
+Requeue = Callable[[Dict[str, Any]], Any]
+# Notify downstream about a recovered result: (device_id, recorded_at, emotion_data)
+Notify = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+JOB_OPTIONS = ("models", "prosody_granularity", "language_granularity", "priority", "tenant_id")
+
+
+class StuckJobReaper:
+    """
+    Periodic sweep over stale processing rows
+
+    For each processing row older than stale_after (by the started_at of its
+    job marker in the registry, or by recorded_at when none was kept):
+    - a recorded Hume job that already completed is fetched, parsed and
+      saved (one bulk upsert per sweep) - no new Hume job is paid for
+    - a recorded Hume job still running is re-queued to resume polling
+    - anything else (never submitted, failed or unknown job) is re-queued
+      from the start
+    - rows whose audio file cannot be found are marked failed
+
+    Rows being processed by any worker are skipped via the job registry
+    claim, so the reaper never races a live pipeline.
+    """
+
+    def __init__(
+        self,
+        hume_provider: HumeProvider,
+        supabase_service,
+        job_registry: JobRegistry,
+        requeue: Requeue,
+        notify: Optional[Notify] = None,
+        archive: Optional[PredictionArchive] = None,
+        stale_after: float = 1800.0,
+        batch_size: int = 50
+    ):
+        """
+        Initialize reaper
+
+        Args:
+            hume_provider: Provider used to re-check recorded job IDs
+            supabase_service: Database service
+            job_registry: Registry holding in-flight claims
+            requeue: Starts a pipeline for a claimed job spec
+            notify: Sends the completion notification for recovered results
+            archive: Raw prediction archive for recovered payloads
+            stale_after: Seconds a row may stay processing before it is reaped
+            batch_size: Maximum rows handled per sweep
+        """
+        self.hume_provider = hume_provider
+        self.supabase_service = supabase_service
+        self.job_registry = job_registry
+        self.requeue = requeue
+        self.notify = notify
+        self.archive = archive
+        self.stale_after = stale_after
+        self.batch_size = batch_size
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Run one sweep
+
+        Returns:
+            Counts of recovered, requeued, failed and skipped rows
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.stale_after)).isoformat()
+        counts = {"recovered": 0, "requeued": 0, "failed": 0, "skipped": 0}
+
+        recovered: List[Dict[str, Any]] = []
+        requeue: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+
+        # Page past rows still in flight (claimed, or re-runs started after
+        # the cutoff) until batch_size rows were handled
+        offset = 0
+        while len(recovered) + len(requeue) + len(failed) < self.batch_size:
+            rows = await self.supabase_service.list_stale_processing(
+                cutoff, limit=self.batch_size, offset=offset
+            )
+            offset += len(rows)
+
+            for row in rows:
+                if len(recovered) + len(requeue) + len(failed) >= self.batch_size:
+                    break
+                device_id, recorded_at = row["device_id"], row["recorded_at"]
+                marker = await self.job_registry.get_marker(device_id, recorded_at) or {}
+                if (marker.get("started_at") or "") >= cutoff:
+                    counts["skipped"] += 1
+                    continue
+                if not await self.job_registry.claim(device_id, recorded_at, owner="reaper"):
+                    counts["skipped"] += 1
+                    continue
+
+                try:
+                    outcome = await self._inspect(row, marker)
+                except Exception as e:
+                    logger.error(f"Reaper failed to inspect {device_id} at {recorded_at}: {e}")
+                    await self.job_registry.release(device_id, recorded_at)
+                    counts["skipped"] += 1
+                    continue
+
+                kind, payload = outcome
+                {"recovered": recovered, "requeue": requeue, "failed": failed}[kind].append(payload)
+
+            if len(rows) < self.batch_size:
+                break
+
+        if not (recovered or requeue or failed or counts["skipped"]):
+            return counts
+
+        if recovered and not await self._save_recovered(recovered):
+            counts["skipped"] += len(recovered)
+            recovered = []
+        if failed and not await self._save_failed(failed):
+            counts["skipped"] += len(failed)
+            failed = []
+
+        for spec in requeue:
+            await self.job_registry.start(spec["device_id"], spec["recorded_at"], spec["file_path"])
+            self.requeue(spec)
+
+        counts.update(recovered=len(recovered), requeued=len(requeue), failed=len(failed))
+        logger.info(
+            f"Reaper sweep: {counts['recovered']} recovered, {counts['requeued']} requeued, "
+            f"{counts['failed']} failed, {counts['skipped']} skipped"
+        )
+        return counts
+
+    async def run(self, interval: float, stop: Callable[[], bool]):
+        """Sweep every interval seconds until stop() is true"""
+        while not stop():
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Reaper sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _inspect(self, row: Dict[str, Any], marker: Dict[str, Any]):
+        """Decide what to do with one claimed stale row (marker is {} if none was kept)"""
+        device_id, recorded_at = row["device_id"], row["recorded_at"]
+        file_path = marker.get("file_path") or await self.supabase_service.get_recording_file(
+            device_id, recorded_at
+        )
+        spec = {
+            "file_path": file_path,
+            "device_id": device_id,
+            "recorded_at": recorded_at,
+            **{option: marker.get(option) for option in JOB_OPTIONS},
+            "job_id": None
+        }
+
+        job_id = marker.get("job_id")
+        if job_id:
+            status = await self._hume_status(job_id)
+            if status == "COMPLETED":
+                result = await self.hume_provider.get_job_predictions(job_id, raw=True)
+                if self.archive:
+                    await self.archive.append(result, job_id, device_id, recorded_at, spec["models"])
+                parsed = await self.hume_provider.parse_results(result, models=spec["models"])
+                if parsed and parsed.get("total_segments", 0):
+                    parsed["job_id"] = job_id
+                else:
+                    parsed = {
+                        "provider": "hume",
+                        "version": "3.0.0",
+                        "error": "No emotion data extracted - audio quality too low",
+                        "job_id": job_id
+                    }
+                return "recovered", {**spec, "job_id": job_id, "emotion_data": parsed}
+            elif status in ("QUEUED", "IN_PROGRESS"):
+                spec["job_id"] = job_id
+
+        if not file_path:
+            return "failed", {**spec, "error": "Audio file not found for stuck job"}
+        return "requeue", spec
+
+    async def _hume_status(self, job_id: str) -> Optional[str]:
+        """Hume job state, or None if the job is unknown/expired"""
+        try:
+            response = await self.hume_provider.get_job_status(job_id)
+        except HumeAPIError as e:
+            if e.status_code in (400, 404):
+                return None
+            raise
+        return response.get("state", {}).get("status")
+
+    async def _save_recovered(self, jobs: List[Dict[str, Any]]) -> bool:
+        if not await self._save(jobs):
+            return False
+        for job in jobs:
+            await self.job_registry.clear_marker(job["device_id"], job["recorded_at"])
+            await self.job_registry.release(job["device_id"], job["recorded_at"])
+            logger.info(f"Recovered completed Hume job {job['job_id']} for {job['device_id']}")
+            if self.notify:
+                await self.notify(job["device_id"], job["recorded_at"], job["emotion_data"])
+        return True
+
+    async def _save_failed(self, jobs: List[Dict[str, Any]]) -> bool:
+        saved = await self._save([
+            {
+                **job,
+                "emotion_data": {"provider": "hume", "version": "3.0.0", "error": job["error"]}
+            }
+            for job in jobs
+        ])
+        if not saved:
+            return False
+        for job in jobs:
+            await self.job_registry.clear_marker(job["device_id"], job["recorded_at"])
+            await self.job_registry.release(job["device_id"], job["recorded_at"])
+        return True
+
+    async def _save(self, jobs: List[Dict[str, Any]]) -> bool:
+        """
+        Bulk save reaped rows
+
+        On failure the markers are kept (the job_id lets the next sweep
+        recover the result again) and only the claims are released.
+        """
+        written = await self.supabase_service.bulk_save_emotion_features(jobs)
+        if written >= len(jobs):
+            return True
+        logger.error(f"Reaper failed to save {len(jobs)} rows - retrying on the next sweep")
+        for job in jobs:
+            await self.job_registry.release(job["device_id"], job["recorded_at"])
+        return False
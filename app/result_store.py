@@ -0,0 +1,185 @@
+"""
+Oversized result offload
+Keeps spot_features rows small by moving large segment data to S3
+"""
+
+import os
+import gzip
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from app import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Key of the pointer left in a row whose full result lives in S3
+POINTER_KEY = "offload"
+TOP_EMOTIONS = 10
+
+
+def is_offloaded(emotion_data: Optional[Dict[str, Any]]) -> bool:
+    """True if a stored result holds a summary and a pointer instead of the segments"""
+    return bool(emotion_data) and POINTER_KEY in emotion_data
+
+
+def summarize_section(section: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Segment-free summary of one result section
+
+    Keeps the scalar fields and replaces "segments" with the mean score of
+    the top emotions and how often each emotion was dominant.
+    """
+    segments = section.get("segments") or []
+    summary = {key: value for key, value in section.items() if key != "segments"}
+
+    totals: Dict[str, float] = {}
+    dominant: Dict[str, int] = {}
+    for segment in segments:
+        for name, score in (segment.get("emotions") or {}).items():
+            totals[name] = totals.get(name, 0.0) + score
+        name = (segment.get("dominant_emotion") or {}).get("name")
+        if name:
+            dominant[name] = dominant.get(name, 0) + 1
+
+    if segments and totals:
+        top = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:TOP_EMOTIONS]
+        summary["mean_emotions"] = {name: round(total / len(segments), 4) for name, total in top}
+    if dominant:
+        summary["dominant_counts"] = dict(sorted(dominant.items(), key=lambda item: item[1], reverse=True))
+    return summary
+
+
+def summarize(emotion_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Row-sized copy of a result: sections (also nested, e.g. "stream") without segments"""
+    summary = {}
+    for key, value in emotion_data.items():
+        if isinstance(value, dict) and "segments" in value:
+            summary[key] = summarize_section(value)
+        elif isinstance(value, dict) and any(isinstance(v, dict) and "segments" in v for v in value.values()):
+            summary[key] = summarize(value)
+        else:
+            summary[key] = value
+    return summary
+
+
+class ResultStore:
+    """
+    Size-aware storage of emotion results
+
+    Results whose JSON encoding exceeds threshold_bytes are written
+    gzip-compressed to s3://bucket/<prefix>/<device_id>/<recorded_at>.json.gz
+    (re-analysis overwrites the object) and the row keeps summarize() plus
+    {"offload": {"bucket", "key", "encoding", "bytes", "stored_bytes"}}.
+    load() fetches the full result again when a reader needs the segments.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        prefix: str = "emotion-results/hume",
+        threshold_bytes: int = 256 * 1024,
+        level: int = 6
+    ):
+        """
+        Initialize store
+
+        Args:
+            s3_client: boto3 S3 client
+            bucket: Bucket for offloaded results
+            prefix: Key prefix
+            threshold_bytes: Encoded size above which a result is offloaded
+            level: gzip compression level
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.threshold_bytes = threshold_bytes
+        self.level = level
+
+    def object_key(self, device_id: str, recorded_at: str) -> str:
+        return f"{self.prefix}/{device_id}/{recorded_at}.json.gz"
+
+    async def shrink(self, device_id: str, recorded_at: str, emotion_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Row value for a result: the result itself, or its summary and a pointer
+
+        Falls back to the full result if the upload fails, so no data is lost.
+        """
+        return await asyncio.to_thread(self.shrink_sync, device_id, recorded_at, emotion_data)
+
+    def shrink_sync(self, device_id: str, recorded_at: str, emotion_data: Dict[str, Any]) -> Dict[str, Any]:
+        if is_offloaded(emotion_data):
+            return emotion_data
+
+        encoded = json_codec.dumps(emotion_data)
+        if len(encoded) <= self.threshold_bytes:
+            return emotion_data
+
+        key = self.object_key(device_id, recorded_at)
+        compressed = gzip.compress(encoded, compresslevel=self.level)
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=compressed,
+                ContentType="application/json",
+                ContentEncoding="gzip"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to offload result for {device_id} at {recorded_at}, storing inline: {e}")
+            return emotion_data
+
+        logger.info(
+            f"Offloaded {len(encoded) / 1024:.0f} KB result for {device_id} at {recorded_at} "
+            f"to s3://{self.bucket}/{key} ({len(compressed) / 1024:.0f} KB compressed)"
+        )
+        return {
+            **summarize(emotion_data),
+            POINTER_KEY: {
+                "bucket": self.bucket,
+                "key": key,
+                "encoding": "gzip",
+                "bytes": len(encoded),
+                "stored_bytes": len(compressed)
+            }
+        }
+
+    async def load(self, emotion_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Full result for a stored row value (fetched from S3 only if offloaded)"""
+        if not is_offloaded(emotion_data):
+            return emotion_data
+        return await asyncio.to_thread(self.load_sync, emotion_data)
+
+    def load_sync(self, emotion_data: Dict[str, Any]) -> Dict[str, Any]:
+        pointer = emotion_data[POINTER_KEY]
+        response = self.s3_client.get_object(Bucket=pointer["bucket"], Key=pointer["key"])
+        body = response["Body"].read()
+        if pointer.get("encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json_codec.loads(body)
+
+
+def create_result_store(s3_client, bucket: Optional[str] = None) -> Optional[ResultStore]:
+    """
+    Create the store configured by RESULT_OFFLOAD_THRESHOLD_KB
+
+    Args:
+        s3_client: boto3 S3 client (None disables offloading)
+        bucket: Bucket (default: RESULT_OFFLOAD_BUCKET, then S3_BUCKET_NAME)
+
+    Returns:
+        Store instance, or None if disabled
+    """
+    threshold_kb = int(os.getenv("RESULT_OFFLOAD_THRESHOLD_KB", 256))
+    if not s3_client or threshold_kb <= 0:
+        return None
+
+    bucket = bucket or os.getenv("RESULT_OFFLOAD_BUCKET") or os.getenv("S3_BUCKET_NAME", "watchme-vault")
+    return ResultStore(
+        s3_client,
+        bucket,
+        prefix=os.getenv("RESULT_OFFLOAD_PREFIX", "emotion-results/hume"),
+        threshold_bytes=threshold_kb * 1024
+    )
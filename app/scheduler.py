@@ -0,0 +1,185 @@
+"""
+Job scheduler
+Weighted fair admission of Hume jobs by priority class, with per-device/tenant quotas
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("live", "normal", "bulk")
+# Class of jobs submitted without a priority (API requests default to it too)
+DEFAULT_PRIORITY = "live"
+DEFAULT_WEIGHTS = {"live": 8.0, "normal": 3.0, "bulk": 1.0}
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    """Parse "live=8,normal=3,bulk=1" (missing classes keep their defaults)"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in (value or "").split(","):
+        if "=" not in part:
+            continue
+        name, weight = part.split("=", 1)
+        if name.strip() in weights:
+            weights[name.strip()] = max(float(weight), 0.01)
+    return weights
+
+
+class JobScheduler:
+    """
+    Admission control in front of Hume job submission
+
+    - At most max_concurrent jobs hold a slot (from submission until Hume
+      completes); the rest wait in one queue per priority class.
+    - Freed slots go to the class with the lowest virtual time, which
+      advances by 1/weight per admitted job (stride scheduling), so classes
+      share capacity in proportion to their weights while all are busy and
+      an idle class doesn't bank credit.
+    - live_reserved slots can only be used by live jobs, so bulk work can
+      never occupy the whole capacity.
+    - A quota key (tenant, or device) may hold at most per_key_limit slots;
+      its further jobs wait without blocking other keys in the same class.
+
+    Scheduling is per worker process; the Hume rate governor still caps
+    submissions across workers.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 20,
+        weights: Optional[Dict[str, float]] = None,
+        per_key_limit: int = 3,
+        live_reserved: int = 4
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            max_concurrent: Hume jobs in flight at once in this worker
+            weights: Share of capacity per priority class
+            per_key_limit: Slots one device/tenant may hold (0 disables the quota)
+            live_reserved: Slots kept free for live jobs
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.per_key_limit = per_key_limit
+        self.live_reserved = min(live_reserved, self.max_concurrent - 1)
+
+        self.running = 0
+        self._running_by_key: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[Tuple[str, asyncio.Future]]] = {p: deque() for p in PRIORITIES}
+        self._vtime: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._admitted: Dict[str, int] = {p: 0 for p in PRIORITIES}
+
+    @asynccontextmanager
+    async def slot(self, priority: str, key: str) -> AsyncIterator[None]:
+        """
+        Hold a job slot for the duration of the block
+
+        Args:
+            priority: "live", "normal" or "bulk" (anything else counts as DEFAULT_PRIORITY)
+            key: Quota key (tenant or device_id)
+        """
+        priority = priority if priority in self._queues else DEFAULT_PRIORITY
+        await self._acquire(priority, key)
+        try:
+            yield
+        finally:
+            self._release(key)
+
+    async def _acquire(self, priority: str, key: str):
+        if self._idle(priority):
+            # A class returning from idle starts at the current virtual time
+            self._vtime[priority] = max(self._vtime[priority], self._min_active_vtime())
+
+        if not any(self._queues.values()) and self._can_run(priority, key):
+            self._admit(priority, key)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (key, waiter)
+        self._queues[priority].append(entry)
+        # Waiters held back by their quota (or by the live reservation) must
+        # not block jobs that can run now: hand out any free slots
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled: give the slot back
+                self._release(key)
+            elif entry in self._queues[priority]:
+                # (a dispatch may already have dropped the cancelled entry)
+                self._queues[priority].remove(entry)
+            raise
+
+    def _release(self, key: str):
+        self.running -= 1
+        self._running_by_key[key] -= 1
+        if not self._running_by_key[key]:
+            del self._running_by_key[key]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting jobs in weighted fair order"""
+        while self.running < self.max_concurrent:
+            candidates = sorted(
+                (p for p in PRIORITIES if self._queues[p]),
+                key=lambda p: (self._vtime[p], PRIORITIES.index(p))
+            )
+            for priority in candidates:
+                entry = self._next_eligible(priority)
+                if entry:
+                    key, waiter = entry
+                    self._queues[priority].remove(entry)
+                    self._admit(priority, key)
+                    waiter.set_result(None)
+                    break
+            else:
+                return
+
+    def _next_eligible(self, priority: str) -> Optional[Tuple[str, asyncio.Future]]:
+        queue = self._queues[priority]
+        # Waiters cancelled in this loop turn (e.g. by the shutdown drain) are
+        # done before their task has left the queue: drop them
+        for entry in [entry for entry in queue if entry[1].done()]:
+            queue.remove(entry)
+        for entry in queue:
+            if self._can_run(priority, entry[0]):
+                return entry
+        return None
+
+    def _can_run(self, priority: str, key: str) -> bool:
+        limit = self.max_concurrent if priority == "live" else self.max_concurrent - self.live_reserved
+        if self.running >= limit:
+            return False
+        return not self.per_key_limit or self._running_by_key.get(key, 0) < self.per_key_limit
+
+    def _admit(self, priority: str, key: str):
+        self.running += 1
+        self._running_by_key[key] = self._running_by_key.get(key, 0) + 1
+        self._vtime[priority] += 1 / self.weights.get(priority, 1.0)
+        self._admitted[priority] += 1
+
+    def _idle(self, priority: str) -> bool:
+        return not self._queues[priority]
+
+    def _min_active_vtime(self) -> float:
+        active = [self._vtime[p] for p in PRIORITIES if self._queues[p]]
+        return min(active) if active else max(self._vtime.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current scheduler state, for diagnostics"""
+        return {
+            "running": self.running,
+            "max_concurrent": self.max_concurrent,
+            "waiting": {p: len(q) for p, q in self._queues.items()},
+            "admitted": dict(self._admitted),
+            "busiest_keys": dict(sorted(
+                self._running_by_key.items(), key=lambda item: item[1], reverse=True
+            )[:5])
+        }
@@ -0,0 +1,177 @@
+"""
+Shared state backend
+Key/value store used for coordination (rate limits, in-flight dedup, job registry)
+across workers and replicas
+"""
+
+import os
+import time
+import fnmatch
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend:
+    """Interface for shared state; values are strings"""
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set key only if it does not exist; True if it was set"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ttl is applied when the counter is created"""
+        raise NotImplementedError
+
+    async def keys(self, pattern: str) -> List[str]:
+        """Keys matching a glob pattern (e.g. "job:*")"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """Process-local backend (single worker)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._data[key] = (value, self._expiry(ttl))
+
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._data[key] = (value, self._expiry(ttl))
+        return True
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        current = self._live(key)
+        if current is None:
+            self._data[key] = ("1", self._expiry(ttl))
+            return 1
+        value = int(current) + 1
+        self._data[key] = (str(value), self._data[key][1])
+        return value
+
+    async def keys(self, pattern: str) -> List[str]:
+        return [key for key in list(self._data) if fnmatch.fnmatchcase(key, pattern) and self._live(key) is not None]
+
+
+class RedisBackend(StateBackend):
+    """Redis-compatible backend (Redis, Valkey, KeyDB, ...) shared by all workers"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "emotion-v3:"):
+        """
+        Initialize Redis backend
+
+        Args:
+            url: Connection URL, e.g. redis://localhost:6379/0
+            prefix: Namespace prepended to every key
+        """
+        # Optional dependency - only needed when a shared backend is configured
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return await self.client.mget([self.prefix + key for key in keys])
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(await self.client.set(
+            self.prefix + key, value, nx=True, px=int(ttl * 1000) if ttl else None
+        ))
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self.prefix + key)
+            if ttl:
+                pipe.pexpire(self.prefix + key, int(ttl * 1000), nx=True)
+            results = await pipe.execute()
+        return int(results[0])
+
+    async def keys(self, pattern: str) -> List[str]:
+        return [
+            key[len(self.prefix):]
+            async for key in self.client.scan_iter(match=self.prefix + pattern, count=500)
+        ]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_state_backend(url: Optional[str] = None) -> StateBackend:
+    """
+    Create the backend configured by STATE_BACKEND_URL
+
+    Args:
+        url: "memory://" (default) or a redis:// / rediss:// URL
+
+    Returns:
+        State backend instance
+    """
+    url = url or os.getenv("STATE_BACKEND_URL", "memory://")
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        logger.info("Using Redis-compatible shared state backend")
+        return RedisBackend(url)
+
+    workers = int(os.getenv("UVICORN_WORKERS", os.getenv("WEB_CONCURRENCY", 1)))
+    if workers > 1:
+        logger.warning(
+            f"{workers} workers with in-memory state: rate limits, dedup and job status "
+            "are per worker - set STATE_BACKEND_URL to share them"
+        )
+    return MemoryBackend()
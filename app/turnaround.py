@@ -0,0 +1,120 @@
+"""
+Hume job turnaround statistics
+Learns how long batch jobs take so polling can be scheduled around it
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+
+class TurnaroundStats:
+    """Rolling job durations bucketed by audio duration and model set"""
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 5,
+        bucket_seconds: float = 30.0
+    ):
+        """
+        Initialize turnaround statistics
+
+        Args:
+            window: Number of recent completions kept per bucket
+            min_samples: Samples required before a bucket is trusted
+            bucket_seconds: Width of an audio duration bucket in seconds
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.bucket_seconds = bucket_seconds
+        self._samples: Dict[Tuple[int, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def bucket_key(
+        self,
+        audio_duration: Optional[float],
+        models: Iterable[str]
+    ) -> Tuple[int, str]:
+        """Bucket key for an audio duration (seconds) and model set"""
+        if audio_duration is None or audio_duration < 0:
+            duration_bucket = -1
+        else:
+            duration_bucket = int(audio_duration // self.bucket_seconds)
+        return duration_bucket, ",".join(sorted(models))
+
+    def record(
+        self,
+        audio_duration: Optional[float],
+        models: Iterable[str],
+        elapsed: float
+    ):
+        """Record the turnaround of a completed job"""
+        key = self.bucket_key(audio_duration, models)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(elapsed)
+
+    def estimate(
+        self,
+        audio_duration: Optional[float],
+        models: Iterable[str],
+        quantile: float = 0.5
+    ) -> Optional[float]:
+        """
+        Estimate the turnaround for a new job
+
+        Args:
+            audio_duration: Audio duration in seconds (None if unknown)
+            models: Hume models requested for the job
+            quantile: Quantile of the observed distribution to return
+
+        Returns:
+            Expected turnaround in seconds, or None without enough samples
+        """
+        key = self.bucket_key(audio_duration, models)
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+
+        if len(samples) < self.min_samples:
+            return None
+
+        index = min(len(samples) - 1, max(0, int(round(quantile * (len(samples) - 1)))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-bucket sample count and median, for diagnostics"""
+        with self._lock:
+            buckets = {key: sorted(samples) for key, samples in self._samples.items()}
+
+        return {
+            f"{duration_bucket}:{models}": {
+                "samples": len(samples),
+                "median": samples[len(samples) // 2]
+            }
+            for (duration_bucket, models), samples in buckets.items()
+            if samples
+        }
+
+
+def poll_delays(
+    first_delay: float,
+    min_interval: float,
+    max_interval: float,
+    backoff: float
+) -> Iterator[float]:
+    """
+    Delays between status polls
+
+    The first poll lands on first_delay (the expected completion time);
+    after that polling starts tight and backs off exponentially up to
+    max_interval.
+    """
+    yield max(first_delay, min_interval)
+
+    delay = min_interval
+    while True:
+        yield delay
+        delay = min(delay * backoff, max_interval)
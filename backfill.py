@@ -0,0 +1,327 @@
+"""
+Bulk backfill for Hume AI Emotion Recognition
+Reprocesses historical recordings of audio_files into spot_features
+
+Usage:
+    python backfill.py --device-id <id> [--device-id <id> ...] \
+        --start 2026-01-01 --end 2026-02-01 [--batch-size 20] [--concurrency 4]
+
+Clips that already have completed results are skipped. Progress is
+checkpointed per device so an interrupted run resumes where it stopped.
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+import boto3
+
+from app import json_codec
+from app.hume_provider import HumeProvider
+from app.emotion_index import EmotionIndex, create_emotion_index, index_rows
+from app.prediction_archive import PredictionArchive, create_prediction_archive
+from app.result_store import create_result_store
+from supabase_service import SupabaseService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("backfill")
+
+# Hume accepts up to 100 URLs per batch job
+MAX_URLS_PER_JOB = 100
+
+
+class BackfillProgress:
+    """Counters and checkpoint for a backfill run"""
+
+    def __init__(self, state_file: str, total: int = 0):
+        self.state_file = state_file
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.retry = 0
+        self.jobs = 0
+        self.started = time.monotonic()
+        self.cursors: Dict[str, str] = {}
+
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                self.cursors = json.load(f).get("cursors", {})
+            logger.info(f"Resuming from {state_file}: {self.cursors}")
+
+    def save_cursor(self, device_id: str, recorded_at: str):
+        """Persist the last fully processed recorded_at of a device"""
+        self.cursors[device_id] = recorded_at
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"cursors": self.cursors}, f)
+        os.replace(tmp_path, self.state_file)
+
+    def report(self):
+        """Log a progress line"""
+        done = self.processed + self.failed + self.skipped
+        elapsed = time.monotonic() - self.started
+        rate = (self.processed + self.failed) / elapsed if elapsed else 0.0
+        remaining = max(0, self.total - done)
+        eta = f"{remaining / rate / 60:.1f}min" if rate else "-"
+        logger.info(
+            f"Progress {done}/{self.total}: processed={self.processed} "
+            f"failed={self.failed} skipped={self.skipped} retry={self.retry} jobs={self.jobs} "
+            f"({rate:.2f} clips/s, ETA {eta})"
+        )
+
+
+class Backfill:
+    """Reprocess audio_files through multi-URL Hume jobs"""
+
+    def __init__(
+        self,
+        hume_provider: HumeProvider,
+        supabase_service: SupabaseService,
+        s3_client,
+        bucket: str,
+        progress: BackfillProgress,
+        batch_size: int = 20,
+        concurrency: int = 4,
+        max_jobs: Optional[int] = None,
+        page_size: int = 1000,
+        models: Optional[List[str]] = None,
+        dry_run: bool = False,
+        archive: Optional[PredictionArchive] = None,
+        index: Optional[EmotionIndex] = None
+    ):
+        self.hume_provider = hume_provider
+        self.supabase_service = supabase_service
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.progress = progress
+        self.batch_size = min(batch_size, MAX_URLS_PER_JOB)
+        self.page_size = page_size
+        self.max_jobs = max_jobs
+        self.models = models
+        self.dry_run = dry_run
+        self.archive = archive
+        self.index = index
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def budget_exhausted(self) -> bool:
+        """True once the Hume job quota for this run is used up"""
+        return self.max_jobs is not None and self.progress.jobs >= self.max_jobs
+
+    async def run_device(self, device_id: str, start: str, end: str):
+        """
+        Backfill one device over [start, end)
+
+        A batch that failed or could not be saved pins the checkpoint before its page:
+        later pages are still processed, and a resumed run pages through
+        them again, skipping what completed, so the batch is retried.
+        """
+        cursor = self.progress.cursors.get(device_id)
+        pinned = False
+
+        while not self.budget_exhausted:
+            page = await self.supabase_service.list_audio_files(
+                device_id, start, end, after=cursor, limit=self.page_size
+            )
+            if not page:
+                break
+
+            completed = await self.supabase_service.get_completed_recordings(
+                device_id, [row['recorded_at'] for row in page]
+            )
+            pending = [row for row in page if row['recorded_at'] not in completed]
+            self.progress.skipped += len(page) - len(pending)
+
+            batches = [
+                pending[i:i + self.batch_size]
+                for i in range(0, len(pending), self.batch_size)
+            ]
+            results = await asyncio.gather(
+                *(self._run_batch(batch) for batch in batches)
+            )
+
+            if "quota" in results:
+                # Quota ran out mid-page; keep the cursor so the rest is retried
+                break
+
+            if "retry" in results and not pinned:
+                pinned = True
+                logger.warning(
+                    f"Keeping the {device_id} checkpoint at {self.progress.cursors.get(device_id)}: "
+                    f"rerun to retry the failed batches"
+                )
+
+            cursor = page[-1]['recorded_at']
+            if not self.dry_run and not pinned:
+                self.progress.save_cursor(device_id, cursor)
+            self.progress.report()
+
+    async def _run_batch(self, clips: List[Dict[str, Any]]) -> str:
+        """
+        Process a batch of clips as a single Hume job
+
+        Returns:
+            "done", "quota" if the batch was not submitted because the quota
+            is exhausted, or "retry" if the job failed or its results could
+            not be saved
+        """
+        async with self._semaphore:
+            if self.budget_exhausted:
+                return "quota"
+            self.progress.jobs += 1
+
+            if self.dry_run:
+                self.progress.processed += len(clips)
+                return "done"
+
+            try:
+                rows = await self._analyze(clips)
+            except Exception as e:
+                # Job-level failures (Hume outage, timeout, S3) say nothing about
+                # the clips: leave them unwritten so a rerun retries them
+                logger.error(f"Batch of {len(clips)} clips failed - left for retry: {e}")
+                self.progress.retry += len(clips)
+                return "retry"
+
+            written = await self.supabase_service.bulk_save_emotion_features(rows)
+            if written < len(rows):
+                # Nothing is counted or indexed; the checkpoint stays before this batch
+                logger.error(f"Failed to save results of {len(rows)} clips - left for retry")
+                self.progress.retry += len(clips)
+                return "retry"
+
+            # Keep /search/similar covering backfilled recordings
+            await index_rows(self.index, rows)
+
+            failed = sum(1 for row in rows if row['emotion_data'].get('error'))
+            self.progress.failed += failed
+            self.progress.processed += len(rows) - failed
+            return "done"
+
+    async def _analyze(self, clips: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run one Hume job for the clips and parse per-clip results"""
+        urls = {
+            self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': clip['file_path']},
+                ExpiresIn=3600
+            ): clip
+            for clip in clips
+        }
+
+        job_id = await self.hume_provider.create_batch_job(
+            list(urls), language="ja", models=self.models
+        )
+        audio_duration = sum(clip.get('duration_seconds') or 0 for clip in clips) or None
+        raw_results = await self.hume_provider.wait_for_job(
+            job_id,
+            audio_duration=audio_duration,
+            timeout=self.hume_provider.poll_timeout * len(clips)
+        )
+        if not raw_results:
+            raise Exception(f"Hume job {job_id} failed or timed out")
+
+        per_url = self.hume_provider.split_predictions(raw_results)
+
+        rows = []
+        for url, clip in urls.items():
+            if self.archive and per_url.get(url):
+                await self.archive.append(
+                    json_codec.dumps(per_url[url]), job_id,
+                    clip['device_id'], clip['recorded_at'], self.models
+                )
+            parsed = await self.hume_provider.parse_results(
+                per_url.get(url), models=self.models
+            )
+            if parsed:
+                parsed["job_id"] = job_id
+            else:
+                parsed = {
+                    "provider": "hume",
+                    "version": "3.0.0",
+                    "job_id": job_id,
+                    "error": "No emotion data extracted - audio quality too low"
+                }
+            rows.append(self._row(clip, parsed))
+        return rows
+
+    @staticmethod
+    def _row(clip: Dict[str, Any], emotion_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "device_id": clip['device_id'],
+            "recorded_at": clip['recorded_at'],
+            "emotion_data": emotion_data
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill Hume emotion features")
+    parser.add_argument("--device-id", action="append", required=True, help="Device to backfill (repeatable)")
+    parser.add_argument("--start", required=True, help="Inclusive start of recorded_at range")
+    parser.add_argument("--end", required=True, help="Exclusive end of recorded_at range")
+    parser.add_argument("--batch-size", type=int, default=20, help="Audio files per Hume job (max 100)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Hume jobs in flight at once")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Hume job budget for this run")
+    parser.add_argument("--models", nargs="+", choices=HumeProvider.DEFAULT_MODELS, default=None)
+    parser.add_argument("--state-file", default=".backfill_state.json", help="Checkpoint file for resume")
+    parser.add_argument("--dry-run", action="store_true", help="Count work without calling Hume")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    load_dotenv()
+
+    hume_provider = HumeProvider(os.environ['HUME_API_KEY'], os.environ['HUME_SECRET_KEY'])
+    s3_client = boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION', 'ap-southeast-2')
+    )
+    supabase_service = SupabaseService(
+        os.environ['SUPABASE_URL'],
+        os.environ['SUPABASE_KEY'],
+        result_store=create_result_store(s3_client)
+    )
+
+    progress = BackfillProgress(args.state_file)
+    for device_id in args.device_id:
+        progress.total += await supabase_service.count_audio_files(device_id, args.start, args.end)
+
+    backfill = Backfill(
+        hume_provider,
+        supabase_service,
+        s3_client,
+        os.getenv('S3_BUCKET_NAME', 'watchme-vault'),
+        progress,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_jobs=args.max_jobs,
+        models=args.models,
+        dry_run=args.dry_run,
+        archive=create_prediction_archive(),
+        index=None if args.dry_run else create_emotion_index()
+    )
+
+    for device_id in args.device_id:
+        logger.info(f"Backfilling {device_id} from {args.start} to {args.end}")
+        await backfill.run_device(device_id, args.start, args.end)
+        if backfill.budget_exhausted:
+            logger.warning(f"Hume job budget of {args.max_jobs} exhausted - rerun to continue")
+            break
+
+    progress.report()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
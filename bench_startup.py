@@ -0,0 +1,116 @@
+"""
+Cold-start benchmark
+
+Usage:
+    python bench_startup.py --runs 5
+
+Measures, in fresh interpreters:
+- import time of main.py
+- time from launching uvicorn until /health (liveness) and /ready
+  (readiness) first answer 200
+
+Credentials default to dummy values so the clients are constructed
+without touching the network; real values from the environment are used
+if set.
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+DUMMY_ENV = {
+    "HUME_API_KEY": "bench",
+    "HUME_SECRET_KEY": "bench",
+    "SUPABASE_URL": "https://bench.supabase.co",
+    "SUPABASE_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+}
+
+
+def bench_env():
+    env = {**DUMMY_ENV, **os.environ}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        capture_output=True, text=True, check=True, env=bench_env()
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def answered(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def measure_server(timeout: float = 30.0):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=bench_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    live = ready = None
+    try:
+        while time.perf_counter() - started < timeout and ready is None:
+            if live is None and answered(f"{base}/health"):
+                live = time.perf_counter() - started
+            if live is not None and answered(f"{base}/ready"):
+                ready = time.perf_counter() - started
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return live, ready
+
+
+def report(label: str, samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        print(f"{label:<18} no samples")
+        return
+    print(
+        f"{label:<18} median {statistics.median(samples) * 1000:7.1f} ms"
+        f"   min {min(samples) * 1000:7.1f} ms   max {max(samples) * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    servers = [measure_server() for _ in range(args.runs)]
+
+    report("import main", imports)
+    report("/health (live)", [live for live, _ in servers])
+    report("/ready", [ready for _, ready in servers])
+
+
+if __name__ == "__main__":
+    main()
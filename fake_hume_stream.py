@@ -0,0 +1,68 @@
+"""
+Fake Hume streaming server for local testing
+
+Usage:
+    python fake_hume_stream.py --port 8765
+    HUME_STREAM_URL=ws://localhost:8765 uvicorn main:app --port 8018
+
+Answers every message with one prosody and one burst prediction spanning
+the chunk, using deterministic scores derived from the audio bytes.
+"""
+
+import json
+import base64
+import asyncio
+import argparse
+import hashlib
+import logging
+
+from websockets.asyncio.server import serve
+
+from app.emotions import PROSODY_EMOTIONS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("fake_hume_stream")
+
+
+def fake_emotions(audio: bytes):
+    digest = hashlib.sha256(audio).digest()
+    return [
+        {"name": name, "score": digest[i % len(digest)] / 255}
+        for i, name in enumerate(PROSODY_EMOTIONS)
+    ]
+
+
+async def handler(websocket):
+    async for message in websocket:
+        request = json.loads(message)
+        try:
+            audio = base64.b64decode(request["data"])
+        except (KeyError, ValueError):
+            await websocket.send(json.dumps({"error": "Invalid data", "code": "E0101"}))
+            continue
+
+        # Pretend 16kHz 16-bit mono, capped at Hume's 5 second limit
+        duration = min(len(audio) / 32000, 5.0)
+        response = {}
+        models = request.get("models", {})
+        if "prosody" in models:
+            response["prosody"] = {"predictions": [
+                {"time": {"begin": 0.0, "end": duration}, "emotions": fake_emotions(audio)}
+            ]}
+        if "burst" in models:
+            response["burst"] = {"predictions": [
+                {"time": {"begin": 0.0, "end": duration / 2}, "emotions": fake_emotions(audio[::-1])}
+            ]}
+        await websocket.send(json.dumps(response))
+
+
+async def main(port: int):
+    async with serve(handler, "localhost", port, max_size=None):
+        logger.info(f"Fake Hume streaming server on ws://localhost:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Hume streaming server")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args().port))
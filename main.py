@@ -4,27 +4,46 @@ Main FastAPI application
 """
 
 import os
-import json
+import time
 import asyncio
 import logging
-from typing import Optional
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-import boto3
-from botocore.exceptions import ClientError
 
 from app.models import (
     HealthResponse,
+    ReadinessResponse,
     AsyncProcessRequest,
     AsyncProcessResponse,
+    ProcessRequest,
+    JobStatus,
+    JobStatusBulkRequest,
+    JobStatusBulkResponse,
+    SimilarityRequest,
+    SimilarityResponse,
     ErrorResponse
 )
 from app.hume_provider import HumeProvider
-from supabase_service import SupabaseService
+from app.hume_stream import DEFAULT_STREAM_URL, HumeStreamPool, StreamSession
+from app import json_codec
+from app.drain import JobTracker, PendingJobStore
+from app.emotion_index import EmotionIndex, create_emotion_index, emotion_vector
+from app.prediction_archive import PredictionArchive, create_prediction_archive
+from app.result_store import create_result_store
+from app.job_registry import JobRegistry
+from app.reaper import StuckJobReaper
+from app.scheduler import DEFAULT_PRIORITY, JobScheduler, parse_weights
+from app.state_backend import create_state_backend
+
+if TYPE_CHECKING:
+    # boto3 and supabase are imported when their clients are created
+    from supabase_service import SupabaseService
 
 # Configure logging
 logging.basicConfig(
@@ -56,9 +75,50 @@ app.add_middleware(
 
 # Initialize services
 hume_provider: Optional[HumeProvider] = None
-supabase_service: Optional[SupabaseService] = None
+supabase_service: Optional["SupabaseService"] = None
+hume_stream_pool: Optional[HumeStreamPool] = None
 sqs_client = None
 s3_client = None
+emotion_index: Optional[EmotionIndex] = None
+prediction_archive: Optional[PredictionArchive] = None
+
+# Background initialization of the Supabase/AWS clients, started on startup
+services_task: Optional[asyncio.Task] = None
+startup_seconds: Optional[float] = None
+
+# Shared state (rate limits, in-flight dedup, job status) - in-memory for a
+# single worker, Redis-compatible via STATE_BACKEND_URL for several
+state_backend = create_state_backend()
+
+# In-flight job status, served by /jobs without touching the database
+job_registry = JobRegistry(
+    state_backend,
+    ttl=float(os.getenv('JOB_REGISTRY_TTL', 3600)),
+    lock_ttl=float(os.getenv('INFLIGHT_LOCK_TTL', 900))
+)
+
+# Pipeline tasks of this worker, drained on shutdown; jobs that cannot
+# finish in time are persisted and resumed by another worker or the next start
+job_tracker = JobTracker()
+pending_jobs = PendingJobStore(state_backend)
+pending_sweeper: Optional[asyncio.Task] = None
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', 40))
+PENDING_SWEEP_INTERVAL = float(os.getenv('PENDING_SWEEP_INTERVAL', 30))
+
+# Stuck-job reaper: rows left in emotion_status = processing (0 disables)
+REAPER_INTERVAL = float(os.getenv('REAPER_INTERVAL', 300))
+REAPER_STALE_AFTER = float(os.getenv('REAPER_STALE_AFTER', 1800))
+REAPER_BATCH_SIZE = int(os.getenv('REAPER_BATCH_SIZE', 50))
+reaper_task: Optional[asyncio.Task] = None
+
+# Admission of Hume jobs: weighted fair share per priority class, slots
+# reserved for live recordings and a per-tenant (or per-device) quota
+job_scheduler = JobScheduler(
+    max_concurrent=int(os.getenv('HUME_MAX_CONCURRENT_JOBS', 20)),
+    weights=parse_weights(os.getenv('SCHEDULER_WEIGHTS')),
+    per_key_limit=int(os.getenv('JOB_QUOTA_PER_KEY', 3)),
+    live_reserved=int(os.getenv('SCHEDULER_LIVE_RESERVED', 4))
+)
 
 # SQS Queue URL
 FEATURE_COMPLETED_QUEUE_URL = os.getenv(
@@ -66,6 +126,12 @@ FEATURE_COMPLETED_QUEUE_URL = os.getenv(
     'https://sqs.ap-southeast-2.amazonaws.com/754724220380/watchme-feature-completed-queue'
 )
 
+# Upper bound for the synchronous /process endpoint (seconds)
+PROCESS_TIMEOUT = float(os.getenv('PROCESS_TIMEOUT', 120))
+
+# Progress callback: (stage, details) -> awaitable
+ProgressCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 # S3 configuration
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'watchme-vault')
 AWS_REGION = os.getenv('AWS_REGION', 'ap-southeast-2')
@@ -73,8 +139,15 @@ AWS_REGION = os.getenv('AWS_REGION', 'ap-southeast-2')
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize services on startup"""
-    global hume_provider, supabase_service, sqs_client, s3_client
+    """
+    Initialize services on startup
+
+    The Hume provider is created inline (it is cheap and needed to accept
+    requests); the Supabase and AWS clients are built and the emotion index
+    is loaded concurrently in the background so the server starts listening
+    immediately. /ready reports when they are done.
+    """
+    global hume_provider, hume_stream_pool, services_task, pending_sweeper, reaper_task
 
     try:
         # Initialize Hume Provider
@@ -85,47 +158,251 @@ async def startup_event():
             logger.error("Hume API credentials not found in environment variables")
             raise ValueError("HUME_API_KEY and HUME_SECRET_KEY must be set")
 
-        hume_provider = HumeProvider(hume_api_key, hume_secret_key)
+        hume_provider = HumeProvider(hume_api_key, hume_secret_key, state_backend=state_backend)
         logger.info("Hume Provider initialized successfully")
 
-        # Initialize Supabase
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_KEY')
-
-        if supabase_url and supabase_key:
-            supabase_service = SupabaseService(supabase_url, supabase_key)
-            logger.info(f"Supabase initialized: {supabase_url}")
-        else:
-            logger.warning("Supabase credentials not found - running without database")
-
-        # Initialize AWS clients
-        aws_access_key = os.getenv('AWS_ACCESS_KEY_ID')
-        aws_secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
-
-        if aws_access_key and aws_secret_key:
-            # S3 client
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=aws_access_key,
-                aws_secret_access_key=aws_secret_key,
-                region_name=AWS_REGION
-            )
-
-            # SQS client
-            sqs_client = boto3.client(
-                'sqs',
-                aws_access_key_id=aws_access_key,
-                aws_secret_access_key=aws_secret_key,
-                region_name=AWS_REGION
-            )
-            logger.info("AWS clients initialized successfully")
-        else:
-            logger.warning("AWS credentials not found - running without AWS services")
+        # Streaming connections are opened lazily on first use
+        hume_stream_pool = HumeStreamPool(
+            hume_api_key,
+            url=os.getenv('HUME_STREAM_URL', DEFAULT_STREAM_URL),
+            size=int(os.getenv('HUME_STREAM_POOL_SIZE', 4))
+        )
 
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         # Continue running even if some services fail to initialize
 
+    services_task = asyncio.create_task(init_clients())
+    pending_sweeper = asyncio.create_task(sweep_pending_jobs())
+    reaper_task = asyncio.create_task(run_reaper())
+
+
+async def init_clients():
+    """Create the Supabase/AWS clients and load the local stores concurrently, off the event loop"""
+    global supabase_service, sqs_client, s3_client, emotion_index, prediction_archive, startup_seconds
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        asyncio.to_thread(create_supabase_service),
+        asyncio.to_thread(create_aws_clients),
+        asyncio.to_thread(create_emotion_index),
+        asyncio.to_thread(create_prediction_archive),
+        return_exceptions=True
+    )
+
+    for name, result in zip(("Supabase", "AWS", "emotion index", "prediction archive"), results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to initialize {name}: {result}")
+            # Continue running even if some services fail to initialize
+
+    if not isinstance(results[0], Exception):
+        supabase_service = results[0]
+    if not isinstance(results[1], Exception):
+        s3_client, sqs_client = results[1]
+    if not isinstance(results[2], Exception):
+        emotion_index = results[2]
+    if not isinstance(results[3], Exception):
+        prediction_archive = results[3]
+
+    # Oversized results go to S3 once both clients exist
+    if supabase_service:
+        supabase_service.result_store = create_result_store(s3_client)
+
+    startup_seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Background initialization finished in {startup_seconds}s")
+
+
+def create_supabase_service() -> Optional["SupabaseService"]:
+    """Create the Supabase service (the supabase package is imported here)"""
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_KEY')
+
+    if not supabase_url or not supabase_key:
+        logger.warning("Supabase credentials not found - running without database")
+        return None
+
+    from supabase_service import SupabaseService
+
+    service = SupabaseService(supabase_url, supabase_key)
+    logger.info(f"Supabase initialized: {supabase_url}")
+    return service
+
+
+def create_aws_clients():
+    """Create the S3 and SQS clients (boto3 is imported here)"""
+    aws_access_key = os.getenv('AWS_ACCESS_KEY_ID')
+    aws_secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
+
+    if not aws_access_key or not aws_secret_key:
+        logger.warning("AWS credentials not found - running without AWS services")
+        return None, None
+
+    import boto3
+
+    # A dedicated session: the default one is not safe to use from worker threads
+    session = boto3.session.Session(
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key,
+        region_name=AWS_REGION
+    )
+    s3 = session.client('s3')
+    sqs = session.client('sqs')
+    logger.info("AWS clients initialized successfully")
+    return s3, sqs
+
+
+async def wait_for_services():
+    """Hold requests that arrive during a cold start until the clients exist"""
+    if services_task and not services_task.done():
+        await asyncio.shield(services_task)
+
+
+async def sweep_pending_jobs():
+    """
+    Resume jobs interrupted by a shutdown
+
+    Runs once at startup; with a shared state backend it keeps sweeping so
+    surviving workers pick up jobs handed over by a draining one.
+    """
+    await wait_for_services()
+
+    while not job_tracker.draining:
+        try:
+            resumed = await resume_pending_jobs()
+            if resumed:
+                logger.info(f"Resumed {resumed} interrupted job(s)")
+        except Exception as e:
+            logger.error(f"Failed to resume pending jobs: {e}")
+
+        if not pending_jobs.shared:
+            return
+        await asyncio.sleep(PENDING_SWEEP_INTERVAL)
+
+
+async def resume_pending_jobs() -> int:
+    """Claim and restart pending jobs; returns how many were resumed"""
+    if not hume_provider:
+        return 0
+
+    resumed = 0
+    for device_id, recorded_at in await pending_jobs.keys():
+        if job_tracker.draining:
+            break
+        # Not yet released by the draining worker, or resumed elsewhere
+        if not await job_registry.claim(device_id, recorded_at):
+            continue
+
+        spec = await pending_jobs.take(device_id, recorded_at)
+        if not spec:
+            await job_registry.release(device_id, recorded_at)
+            continue
+
+        logger.info(
+            f"Resuming {device_id} at {recorded_at}"
+            + (f" (Hume job {spec['job_id']})" if spec.get("job_id") else "")
+        )
+        await job_registry.start(device_id, recorded_at, spec.get("file_path"))
+        start_pipeline(spec)
+        resumed += 1
+
+    return resumed
+
+
+async def run_reaper():
+    """Periodically recover rows stuck in processing"""
+    await wait_for_services()
+
+    if REAPER_INTERVAL <= 0 or not hume_provider or not supabase_service:
+        return
+    if state_backend.name == "memory":
+        # Claims and job markers must be visible to every replica and survive
+        # a restart, or the reaper would resubmit jobs still running elsewhere
+        logger.warning("Stuck-job reaper disabled: it needs a shared state backend (STATE_BACKEND_URL)")
+        return
+
+    reaper = StuckJobReaper(
+        hume_provider,
+        supabase_service,
+        job_registry,
+        requeue=start_pipeline,
+        notify=notify_recovered,
+        archive=prediction_archive,
+        stale_after=REAPER_STALE_AFTER,
+        batch_size=REAPER_BATCH_SIZE
+    )
+    await reaper.run(REAPER_INTERVAL, stop=lambda: job_tracker.draining)
+
+
+async def notify_recovered(device_id: str, recorded_at: str, emotion_data: Dict[str, Any]):
+    """Index and notify a result recovered by the reaper"""
+    if not emotion_data.get("error"):
+        await index_result(device_id, recorded_at, emotion_data)
+    if sqs_client:
+        await send_completion_notification(
+            device_id=device_id,
+            recorded_at=recorded_at,
+            status="failed" if emotion_data.get("error") else "completed",
+            segments=emotion_data.get("total_segments", 0),
+            error=emotion_data.get("error")
+        )
+
+
+def start_pipeline(spec: Dict[str, Any], on_progress: Optional[ProgressCallback] = None) -> asyncio.Task:
+    """Run process_emotion_analysis for a job spec as a tracked task"""
+    return job_tracker.spawn(spec, process_emotion_analysis(
+        spec["file_path"],
+        spec["device_id"],
+        spec["recorded_at"],
+        models=spec.get("models"),
+        prosody_granularity=spec.get("prosody_granularity"),
+        language_granularity=spec.get("language_granularity"),
+        priority=spec.get("priority"),
+        tenant_id=spec.get("tenant_id"),
+        job_id=spec.get("job_id"),
+        on_progress=on_progress
+    ))
+
+
+def reject_if_draining():
+    """Refuse new work once shutdown has started"""
+    if job_tracker.draining:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Shutting down - retry on another instance",
+            headers={"Retry-After": "5"}
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Drain in-flight jobs, then release upstream connections
+
+    Running pipelines get SHUTDOWN_DRAIN_TIMEOUT seconds to finish (saving
+    and notifying as usual); the rest are cancelled and persisted with their
+    Hume job_id so the polling resumes elsewhere instead of resubmitting.
+    """
+    for task in (pending_sweeper, reaper_task):
+        if task:
+            task.cancel()
+
+    interrupted = await job_tracker.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    for spec in interrupted:
+        entry = await job_registry.get(spec["device_id"], spec["recorded_at"])
+        spec["job_id"] = entry["job_id"] if entry else None
+        await job_registry.update(
+            spec["device_id"], spec["recorded_at"], "interrupted", {"job_id": spec["job_id"]}
+        )
+    await pending_jobs.save(interrupted)
+
+    if hume_stream_pool:
+        await hume_stream_pool.close()
+    await state_backend.close()
+    if prediction_archive:
+        prediction_archive.close()
+    if hume_provider:
+        hume_provider.parse_pool.shutdown()
+
 
 @app.get("/", response_model=dict)
 async def root():
@@ -140,7 +417,13 @@ async def root():
         },
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "async_process": "/async-process",
+            "process": "/process",
+            "stream": "/ws/stream",
+            "jobs": "/jobs/{device_id}/{recorded_at}",
+            "jobs_bulk": "/jobs/status",
+            "similar": "/search/similar",
             "docs": "/docs"
         }
     }
@@ -148,10 +431,13 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness - answers while clients are still initializing)"""
     try:
         # Check service status
         is_healthy = hume_provider is not None
+        circuit = hume_provider.governor.snapshot() if hume_provider else None
+        if circuit and circuit["state"] != "closed":
+            is_healthy = False
 
         return HealthResponse(
             status="healthy" if is_healthy else "degraded",
@@ -159,7 +445,9 @@ async def health_check():
             version="3.0.0",
             provider_loaded=hume_provider is not None,
             supabase_connected=supabase_service is not None,
-            aws_connected=s3_client is not None
+            aws_connected=s3_client is not None,
+            hume_circuit=circuit,
+            scheduler=job_scheduler.snapshot()
         )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -169,18 +457,39 @@ async def health_check():
         )
 
 
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers
+    Returns 503 until background initialization has finished
+    """
+    checks = {
+        "hume_provider": hume_provider is not None,
+        "clients_initialized": services_task is not None and services_task.done(),
+        "accepting": not job_tracker.draining
+    }
+    ready = all(checks.values())
+    checks["supabase"] = supabase_service is not None
+    checks["aws"] = s3_client is not None
+
+    response = ReadinessResponse(ready=ready, checks=checks, startup_seconds=startup_seconds)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=response.dict()
+    )
+
+
 @app.post("/async-process",
           status_code=status.HTTP_202_ACCEPTED,
           response_model=AsyncProcessResponse)
-async def async_process(
-    request: AsyncProcessRequest,
-    background_tasks: BackgroundTasks
-):
+async def async_process(request: AsyncProcessRequest):
     """
     Asynchronous emotion analysis endpoint
     Returns 202 Accepted immediately and processes in background
     """
     logger.info(f"Starting async processing for {request.device_id} at {request.recorded_at}")
+    reject_if_draining()
+    await wait_for_services()
 
     # Validate services
     if not hume_provider:
@@ -192,13 +501,20 @@ async def async_process(
     if not supabase_service:
         logger.warning("Processing without database - results will not be saved")
 
-    # Add background task
-    background_tasks.add_task(
-        process_emotion_analysis,
-        request.file_path,
-        request.device_id,
-        request.recorded_at
-    )
+    # Deduplicate across workers: the same recording is processed once at a time
+    if not await job_registry.claim(request.device_id, request.recorded_at):
+        logger.info(f"Skipping duplicate request for {request.device_id} at {request.recorded_at}")
+        return AsyncProcessResponse(
+            status="duplicate",
+            message="Emotion analysis already in progress",
+            device_id=request.device_id,
+            recorded_at=request.recorded_at
+        )
+
+    await job_registry.start(request.device_id, request.recorded_at, request.file_path)
+
+    # Run in background (tracked so shutdown can drain it)
+    start_pipeline(request.dict())
 
     return AsyncProcessResponse(
         status="accepted",
@@ -208,53 +524,416 @@ async def async_process(
     )
 
 
+@app.post("/process")
+async def process(request: ProcessRequest):
+    """
+    Synchronous emotion analysis endpoint
+    Runs the same pipeline as /async-process and streams stage progress
+    and the final parsed result as Server-Sent Events
+    """
+    logger.info(f"Starting streaming processing for {request.device_id} at {request.recorded_at}")
+    reject_if_draining()
+    await wait_for_services()
+
+    if not hume_provider:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hume Provider not initialized"
+        )
+
+    if not await job_registry.claim(request.device_id, request.recorded_at):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Emotion analysis already in progress"
+        )
+
+    timeout = min(request.timeout or PROCESS_TIMEOUT, PROCESS_TIMEOUT)
+    await job_registry.start(request.device_id, request.recorded_at, request.file_path)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def on_progress(stage: str, details: Dict[str, Any]):
+        await events.put(("progress", {"stage": stage, **details}))
+
+    # The pipeline keeps running if the client disconnects or the stream
+    # times out, so the result is still saved and notified as usual
+    pipeline = start_pipeline(request.dict(exclude={"timeout"}), on_progress=on_progress)
+    pipeline.add_done_callback(lambda _: events.put_nowait(None))
+
+    return StreamingResponse(
+        stream_events(events, pipeline, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def stream_events(
+    events: asyncio.Queue,
+    pipeline: asyncio.Task,
+    timeout: float
+) -> AsyncIterator[str]:
+    """Relay pipeline progress as SSE until the result or the timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # The pipeline reports its error in the "failed" stage and returns None
+    failure: Optional[Dict[str, Any]] = None
+
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json_codec.dumps_str(data)}\n\n"
+
+    yield sse("progress", {"stage": "accepted"})
+
+    while True:
+        remaining = deadline - loop.time()
+        try:
+            item = await asyncio.wait_for(events.get(), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            yield sse("error", {
+                "error": f"Processing did not finish within {timeout:.0f}s",
+                "detail": "Processing continues in background; result will be saved to the database"
+            })
+            return
+
+        if item is None:
+            break
+        event, data = item
+        if data.get("stage") == "failed":
+            failure = data
+        yield sse(event, data)
+
+    if pipeline.cancelled():
+        # Drained on shutdown; the job is persisted and resumed elsewhere
+        yield sse("error", {
+            "error": "Server shutting down",
+            "detail": "Processing will resume on another instance; result will be saved to the database"
+        })
+        return
+
+    exc = pipeline.exception()
+    if exc:
+        yield sse("error", {"error": "Internal server error", "detail": str(exc)})
+        return
+
+    result = pipeline.result()
+    if result:
+        yield sse("result", result)
+    elif failure:
+        yield sse("error", {"error": failure.get("error") or "Processing failed", "job_id": failure.get("job_id")})
+    else:
+        yield sse("error", {"error": "No emotion data extracted"})
+
+
+@app.get("/jobs/{device_id}/{recorded_at:path}", response_model=JobStatus)
+async def get_job(device_id: str, recorded_at: str):
+    """Status of one job from the in-memory registry"""
+    entry = await job_registry.get(device_id, recorded_at)
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No job for {device_id} at {recorded_at} (unknown or evicted)"
+        )
+    return JobStatus(**entry)
+
+
+@app.post("/jobs/status", response_model=JobStatusBulkResponse)
+async def get_jobs(request: JobStatusBulkRequest):
+    """
+    Bulk job status from the in-memory registry
+    Returns the requested jobs, or every in-flight job (optionally per device) if none are listed
+    """
+    if request.jobs:
+        entries = await job_registry.get_many(
+            (job.device_id, job.recorded_at) for job in request.jobs
+        )
+        missing = [
+            job for job, entry in zip(request.jobs, entries) if entry is None
+        ]
+        jobs = [JobStatus(**entry) for entry in entries if entry]
+    else:
+        missing = []
+        jobs = [
+            JobStatus(**entry)
+            for entry in await job_registry.list_jobs(request.device_id, in_flight_only=True)
+        ]
+
+    return JobStatusBulkResponse(jobs=jobs, missing=missing, in_flight=await job_registry.in_flight())
+
+
+@app.post("/search/similar", response_model=SimilarityResponse)
+async def search_similar(request: SimilarityRequest):
+    """
+    Find segments with a similar emotion profile across devices
+    Query by an indexed example segment (device_id, recorded_at, segment_id)
+    or by emotion scores
+    """
+    await wait_for_services()
+    if not emotion_index:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Emotion index not enabled"
+        )
+
+    exclude = None
+    if request.emotions:
+        vector = emotion_vector(request.emotions, request.space)
+        if vector is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No known {request.space} emotion with a positive score"
+            )
+    elif request.device_id and request.recorded_at and request.segment_id is not None:
+        vector = await emotion_index.get_vector(
+            request.space, request.device_id, request.recorded_at, request.segment_id
+        )
+        if vector is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Segment {request.segment_id} of {request.device_id} at {request.recorded_at} is not indexed"
+            )
+        if not request.include_same_recording:
+            exclude = (request.device_id, request.recorded_at)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide emotions, or device_id, recorded_at and segment_id of an example segment"
+        )
+
+    started = time.perf_counter()
+    matches, searched = await emotion_index.search(
+        request.space, vector, k=request.k, device_id=request.filter_device_id, exclude=exclude
+    )
+    return SimilarityResponse(
+        space=request.space,
+        matches=matches,
+        searched=searched,
+        took_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
+
+@app.websocket("/ws/stream")
+async def stream_analysis(
+    websocket: WebSocket,
+    device_id: Optional[str] = None,
+    recorded_at: Optional[str] = None,
+    chunk_seconds: Optional[float] = None
+):
+    """
+    Real-time emotion analysis over WebSocket
+
+    The client sends binary audio chunks (up to 5 seconds each) and receives
+    per-chunk prosody/burst segments. Sending {"type": "end"} or closing the
+    socket ends the session; if device_id and recorded_at are given, the
+    accumulated result is merged into spot_features.
+
+    An upstream connection is leased from the pool on the first audio chunk,
+    so idle clients don't hold pool slots.
+    """
+    if not hume_stream_pool or not hume_provider:
+        await websocket.close(code=1013, reason="Hume streaming not initialized")
+        return
+    if job_tracker.draining:
+        await websocket.close(code=1013, reason="Shutting down - retry on another instance")
+        return
+
+    await websocket.accept()
+    await wait_for_services()
+    session = StreamSession(hume_provider, chunk_seconds=chunk_seconds)
+    connected = True
+
+    try:
+        async with AsyncExitStack() as stack:
+            upstream = None
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    connected = False
+                    break
+
+                if message.get("text") is not None:
+                    control = json_codec.loads(message["text"])
+                    if control.get("type") == "end":
+                        break
+                    continue
+
+                if upstream is None:
+                    if job_tracker.draining:
+                        raise Exception("Server shutting down - retry on another instance")
+                    upstream = await stack.enter_async_context(hume_stream_pool.connection())
+
+                response = await upstream.predict(message["bytes"])
+                await websocket.send_text(json_codec.dumps_str(session.add(response)))
+
+    except WebSocketDisconnect:
+        connected = False
+    except Exception as e:
+        logger.error(f"Streaming session failed for {device_id}: {e}")
+        if connected:
+            await websocket.send_json({"type": "error", "error": str(e)})
+
+    result = session.result()
+    saved = False
+    if supabase_service and device_id and recorded_at and result["total_segments"]:
+        saved = await save_stream_result(device_id, recorded_at, result)
+
+    logger.info(
+        f"Streaming session for {device_id} ended: "
+        f"{session.chunks} chunks, {result['total_segments']} segments"
+    )
+
+    if connected:
+        await websocket.send_json({
+            "type": "summary",
+            "chunks": session.chunks,
+            "total_segments": result["total_segments"],
+            "saved": saved
+        })
+        await websocket.close()
+
+
+async def save_stream_result(
+    device_id: str,
+    recorded_at: str,
+    result: Dict[str, Any]
+) -> bool:
+    """
+    Merge a streaming session result into spot_features
+
+    An existing successful batch result is kept and the streaming result is
+    attached under "stream"; otherwise the streaming result is stored as is.
+    Nothing is saved if the existing result can't be read, so an offloaded
+    batch result never loses its S3 pointer.
+    """
+    try:
+        existing = await supabase_service.check_existing_features(device_id, recorded_at, full=True)
+    except Exception as e:
+        logger.error(f"Not saving streaming result for {device_id} at {recorded_at}: {e}")
+        return False
+    # Job markers left in the column by earlier versions are not batch results
+    if existing and not existing.get("error") and existing.get("status") != "processing":
+        emotion_data = {**existing, "stream": result}
+    else:
+        emotion_data = result
+
+    return await supabase_service.save_emotion_features(
+        device_id=device_id,
+        recorded_at=recorded_at,
+        emotion_data=emotion_data
+    )
+
+
 async def process_emotion_analysis(
     file_path: str,
     device_id: str,
-    recorded_at: str
-):
+    recorded_at: str,
+    models: Optional[List[str]] = None,
+    prosody_granularity: Optional[str] = None,
+    language_granularity: Optional[str] = None,
+    priority: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> Optional[Dict[str, Any]]:
     """
     Background task for emotion analysis
+
+    Args:
+        priority: Scheduling class (live, normal, bulk); DEFAULT_PRIORITY ("live") if unset
+        tenant_id: Quota key for the scheduler (defaults to the device)
+        job_id: Hume job submitted before a restart - resume polling it instead of resubmitting
+        on_progress: Optional callback invoked at each pipeline stage
+
+    Returns:
+        Parsed emotion data, or None if no emotion data was extracted or
+        processing failed (the error is reported with the "failed" stage)
     """
     start_time = datetime.utcnow()
-    job_id = None
+    parsed_result = None
+    priority = priority or DEFAULT_PRIORITY
+    # Waiting for a scheduler slot or a long Hume job can outlast INFLIGHT_LOCK_TTL;
+    # keep the claim so the reaper never resubmits a running job
+    keepalive = asyncio.create_task(job_registry.keep_claim(device_id, recorded_at))
+
+    async def report(stage: str, **details):
+        await job_registry.update(device_id, recorded_at, stage, details)
+        if on_progress:
+            await on_progress(stage, details)
 
     try:
-        # Update status to processing
+        # Update status to processing (the only write before the final result);
+        # the job marker lives in the shared state so the reaper can recover the row
+        marker = {
+            "file_path": file_path,
+            "models": models,
+            "prosody_granularity": prosody_granularity,
+            "language_granularity": language_granularity,
+            "priority": priority,
+            "tenant_id": tenant_id,
+            "started_at": start_time.isoformat(),
+            "job_id": job_id
+        }
+        await job_registry.set_marker(device_id, recorded_at, marker)
         if supabase_service:
-            await supabase_service.update_emotion_status(
-                device_id, recorded_at, "processing"
-            )
+            await supabase_service.update_emotion_status(device_id, recorded_at, "processing")
 
-        # Generate presigned URL for S3 file
-        if not s3_client:
-            raise Exception("S3 client not initialized")
+        # Audio duration lets the provider predict the job turnaround
+        audio_duration = None
+        if supabase_service:
+            audio_info = await supabase_service.get_audio_file_info(file_path)
+            if audio_info:
+                audio_duration = audio_info.get('duration_seconds')
 
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': S3_BUCKET_NAME, 'Key': file_path},
-            ExpiresIn=3600
-        )
-        logger.info(f"Generated presigned URL for {file_path}")
+        # Wait for a slot; it is held until Hume has finished the job
+        await report("queued", priority=priority)
+        async with job_scheduler.slot(priority, tenant_id or device_id):
+            if job_id:
+                logger.info(f"Resuming Hume job: {job_id}")
+            else:
+                # Generate presigned URL for S3 file
+                if not s3_client:
+                    raise Exception("S3 client not initialized")
 
-        # Submit job to Hume API
-        job_id = await hume_provider.create_job(
-            audio_url=presigned_url,
-            language="ja"  # Japanese language for better STT
-        )
-        logger.info(f"Created Hume job: {job_id}")
+                presigned_url = s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': S3_BUCKET_NAME, 'Key': file_path},
+                    ExpiresIn=3600
+                )
+                logger.info(f"Generated presigned URL for {file_path}")
+                await report("presigned")
+
+                # Submit job to Hume API
+                job_id = await hume_provider.create_job(
+                    audio_url=presigned_url,
+                    language="ja",  # Japanese language for better STT
+                    models=models,
+                    prosody_granularity=prosody_granularity,
+                    language_granularity=language_granularity
+                )
+                logger.info(f"Created Hume job: {job_id}")
+                await job_registry.set_marker(device_id, recorded_at, {**marker, "job_id": job_id})
+            await report("submitted", job_id=job_id)
 
-        # Poll for job completion
-        result = await hume_provider.wait_for_job(job_id)
+            # Poll for job completion
+            # Raw bytes: decoding and parsing happen in parse_results (offloaded when large)
+            result = await hume_provider.wait_for_job(job_id, audio_duration=audio_duration, raw=True)
 
         if not result:
             raise Exception("Job completed but no results returned")
 
+        await archive_predictions(result, job_id, device_id, recorded_at, models)
+
         # Process and save results
         processing_time = (datetime.utcnow() - start_time).total_seconds()
 
+        await report("hume_completed", job_id=job_id, elapsed=processing_time)
+
         # Parse Hume results
-        parsed_result = await hume_provider.parse_results(result)
+        parsed_result = await hume_provider.parse_results(result, models=models)
+        if parsed_result:
+            parsed_result["job_id"] = job_id
+            parsed_result["processing_time"] = processing_time
+        await report(
+            "parsed",
+            total_segments=parsed_result.get('total_segments', 0) if parsed_result else 0
+        )
 
         # Check if we got valid emotion data
         if not parsed_result or parsed_result.get('total_segments', 0) == 0:
@@ -273,25 +952,24 @@ async def process_emotion_analysis(
                         "processing_time": processing_time
                     }
                 )
-
-                await supabase_service.update_emotion_status(
-                    device_id, recorded_at, "failed"
-                )
         else:
             # Valid emotion data
             logger.info(f"Extracted {parsed_result['total_segments']} segments with emotion data")
 
             if supabase_service:
                 # Save to database
-                await supabase_service.save_emotion_features(
+                saved = await supabase_service.save_emotion_features(
                     device_id=device_id,
                     recorded_at=recorded_at,
                     emotion_data=parsed_result
                 )
+                if not saved:
+                    raise Exception("Failed to save emotion features")
 
-                await supabase_service.update_emotion_status(
-                    device_id, recorded_at, "completed"
-                )
+            await index_result(device_id, recorded_at, parsed_result)
+
+        await report("saved", status="completed" if parsed_result else "failed")
+        await job_registry.clear_marker(device_id, recorded_at)
 
         # Send SQS notification
         if sqs_client:
@@ -303,18 +981,15 @@ async def process_emotion_analysis(
             )
 
         logger.info(f"Completed emotion analysis for {device_id} in {processing_time:.2f}s")
+        return parsed_result
 
     except Exception as e:
         logger.error(f"Failed to process {file_path}: {str(e)}")
 
-        # Update status to failed
+        # Save error information (also sets emotion_status to failed)
+        saved = True
         if supabase_service:
-            await supabase_service.update_emotion_status(
-                device_id, recorded_at, "failed"
-            )
-
-            # Save error information
-            await supabase_service.save_emotion_features(
+            saved = await supabase_service.save_emotion_features(
                 device_id=device_id,
                 recorded_at=recorded_at,
                 emotion_data={
@@ -334,6 +1009,43 @@ async def process_emotion_analysis(
                 error=str(e)
             )
 
+        await report("failed", error=str(e), job_id=job_id)
+        if saved:
+            # Otherwise the row is still processing: the marker lets the reaper recover it
+            await job_registry.clear_marker(device_id, recorded_at)
+        return None
+
+    finally:
+        keepalive.cancel()
+        await job_registry.release(device_id, recorded_at)
+
+
+async def archive_predictions(
+    payload: bytes,
+    job_id: str,
+    device_id: str,
+    recorded_at: str,
+    models: Optional[List[str]]
+):
+    """Keep the raw predictions for re-parsing without Hume (failures are only logged)"""
+    if not prediction_archive:
+        return
+    try:
+        await prediction_archive.append(payload, job_id, device_id, recorded_at, models)
+    except Exception as e:
+        logger.error(f"Failed to archive predictions of job {job_id}: {e}")
+
+
+async def index_result(device_id: str, recorded_at: str, result: Dict[str, Any]):
+    """Add a result's segment vectors to the similarity index (failures are only logged)"""
+    if not emotion_index:
+        return
+    try:
+        added = await emotion_index.add_result(device_id, recorded_at, result)
+        logger.info(f"Indexed {added} segment vectors for {device_id}")
+    except Exception as e:
+        logger.error(f"Failed to index emotion vectors for {device_id}: {e}")
+
 
 async def send_completion_notification(
     device_id: str,
@@ -359,7 +1071,7 @@ async def send_completion_notification(
 
         sqs_client.send_message(
             QueueUrl=FEATURE_COMPLETED_QUEUE_URL,
-            MessageBody=json.dumps(message)
+            MessageBody=json_codec.dumps_str(message)
         )
         logger.info(f"Sent SQS notification for {device_id}: {status}")
 
@@ -0,0 +1,168 @@
+"""
+Re-parse archived Hume predictions
+Rebuilds spot_features entries from the raw prediction archive without calling Hume
+
+Usage:
+    python reparse.py [--archive-path predictions_archive] [--device-id <id> ...] \
+        [--start 2026-01-01] [--end 2026-02-01] [--job-id <id> ...] [--batch-size 500]
+
+Use after a parser change or to add new aggregates: the latest archived
+payload of each matching recording is decoded from the memory-mapped
+segments, parsed with the current parser (in a process pool) and upserted
+in bulk.
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.emotion_index import EmotionIndex, create_emotion_index, index_rows
+from app.offload import parse_payload
+from app.prediction_archive import PredictionArchive
+from app.result_store import create_result_store
+from supabase_service import SupabaseService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("reparse")
+
+
+class Reparse:
+    """Parse archived payloads and upsert the results in batches"""
+
+    def __init__(
+        self,
+        archive: PredictionArchive,
+        supabase_service: Optional[SupabaseService],
+        batch_size: int = 500,
+        workers: Optional[int] = None,
+        dry_run: bool = False,
+        index: Optional[EmotionIndex] = None
+    ):
+        self.archive = archive
+        self.supabase_service = supabase_service
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.index = index
+        self.parsed = 0
+        self.empty = 0
+        self.saved = 0
+
+    async def run(self, entries: List[Dict[str, Any]]):
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for i in range(0, len(entries), self.batch_size):
+                batch = entries[i:i + self.batch_size]
+                rows = await asyncio.to_thread(self._parse_batch, pool, batch)
+
+                if rows and not self.dry_run and self.supabase_service:
+                    written = await self.supabase_service.bulk_save_emotion_features(rows)
+                    self.saved += written
+                    # Re-parsed segments replace the recording's rows in the similarity index
+                    if written == len(rows):
+                        await index_rows(self.index, rows)
+
+                done = i + len(batch)
+                logger.info(
+                    f"Re-parsed {done}/{len(entries)} recordings "
+                    f"({done / max(time.monotonic() - started, 1e-6):.0f}/s)"
+                )
+
+    def _parse_batch(self, pool: ProcessPoolExecutor, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        payloads = [self.archive.read(entry) for entry in batch]
+        models = [entry.get("models") for entry in batch]
+
+        rows = []
+        for entry, parsed in zip(batch, pool.map(parse_payload, payloads, models, chunksize=16)):
+            if not parsed or not parsed.get("total_segments", 0):
+                # Leave the stored row alone: an empty re-parse (a parser
+                # regression, or a payload that never had segments) must not
+                # replace a good result with an error
+                logger.warning(
+                    f"No segments re-parsed for {entry['device_id']} at {entry['recorded_at']} - skipped"
+                )
+                self.empty += 1
+                continue
+
+            parsed["job_id"] = entry.get("job_id")
+            parsed["reparsed_at"] = datetime.utcnow().isoformat()
+            self.parsed += 1
+            rows.append({
+                "device_id": entry["device_id"],
+                "recorded_at": entry["recorded_at"],
+                "emotion_data": parsed
+            })
+        return rows
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-parse archived Hume predictions into spot_features")
+    parser.add_argument("--archive-path", default=os.getenv("PREDICTION_ARCHIVE_PATH") or "predictions_archive")
+    parser.add_argument("--device-id", action="append", default=None, help="Device to re-parse (repeatable)")
+    parser.add_argument("--start", default=None, help="Inclusive start of recorded_at range")
+    parser.add_argument("--end", default=None, help="Exclusive end of recorded_at range")
+    parser.add_argument("--job-id", action="append", default=None, help="Only payloads of this Hume job (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per bulk upsert")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Parse without writing to the database")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    load_dotenv()
+
+    archive = PredictionArchive(args.archive_path)
+    if args.job_id:
+        entries = [entry for job_id in args.job_id for entry in archive.by_job(job_id)]
+    else:
+        entries = list(archive.latest(args.device_id, args.start, args.end))
+
+    supabase_service = None
+    if not args.dry_run:
+        # Oversized results are offloaded to S3 as in the API (when AWS is configured)
+        s3_client = None
+        if os.getenv('AWS_ACCESS_KEY_ID') and os.getenv('AWS_SECRET_ACCESS_KEY'):
+            import boto3
+            s3_client = boto3.client(
+                's3',
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                region_name=os.getenv('AWS_REGION', 'ap-southeast-2')
+            )
+        supabase_service = SupabaseService(
+            os.environ['SUPABASE_URL'],
+            os.environ['SUPABASE_KEY'],
+            result_store=create_result_store(s3_client)
+        )
+
+    logger.info(f"Re-parsing {len(entries)} archived recordings from {args.archive_path}")
+    reparse = Reparse(
+        archive,
+        supabase_service,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        index=None if args.dry_run else create_emotion_index()
+    )
+    await reparse.run(entries)
+    archive.close()
+
+    logger.info(
+        f"Done: {reparse.parsed} parsed, {reparse.empty} without emotion data (not written), "
+        f"{reparse.saved} rows saved"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,13 +3,18 @@ Supabase Service for Hume AI Emotion Recognition API
 Handles database operations
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set
 from datetime import datetime
 import json
 
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
+from postgrest import APIError, APIResponse
+
+from app import json_codec
+from app.result_store import ResultStore, is_offloaded
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +22,23 @@ logger = logging.getLogger(__name__)
 class SupabaseService:
     """Service for Supabase database operations"""
 
-    def __init__(self, supabase_url: str, supabase_key: str):
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        result_store: Optional[ResultStore] = None
+    ):
         """
         Initialize Supabase client
 
         Args:
             supabase_url: Supabase project URL
             supabase_key: Supabase service role key
+            result_store: Offloads oversized results to S3 (None stores every result inline)
         """
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
+        self.result_store = result_store
 
         # Create client with proper configuration
         options = ClientOptions(
@@ -42,6 +54,45 @@ class SupabaseService:
 
         logger.info(f"Supabase client initialized for {supabase_url}")
 
+    async def _execute(self, query):
+        """
+        Execute a query builder in a worker thread
+
+        The client is synchronous; running it off the event loop keeps JSON
+        encoding of large results and the HTTP round trip from blocking
+        other requests.
+        """
+        return await asyncio.to_thread(self._execute_sync, query)
+
+    @staticmethod
+    def _execute_sync(query):
+        """Execute a query, encoding write bodies with the fast JSON backend"""
+        body = getattr(query, 'json', None)
+        if not body or query.http_method not in ('POST', 'PATCH'):
+            return query.execute()
+
+        response = query.session.request(
+            query.http_method,
+            query.path,
+            content=json_codec.dumps(body),
+            params=query.params,
+            headers={**query.headers, 'Content-Type': 'application/json'}
+        )
+        if not response.is_success:
+            raise APIError(json_codec.loads(response.content))
+        return APIResponse.from_http_request_response(response)
+
+    async def _row_value(
+        self,
+        device_id: str,
+        recorded_at: str,
+        emotion_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Value stored in emotion_features_result_hume (summary + S3 pointer when oversized)"""
+        if not self.result_store:
+            return emotion_data
+        return await self.result_store.shrink(device_id, recorded_at, emotion_data)
+
     async def update_emotion_status(
         self,
         device_id: str,
@@ -61,9 +112,9 @@ class SupabaseService:
         """
         try:
             # Update emotion_status column
-            response = self.client.table('spot_features').update({
+            response = await self._execute(self.client.table('spot_features').update({
                 'emotion_status': status
-            }).eq('device_id', device_id).eq('recorded_at', recorded_at).execute()
+            }).eq('device_id', device_id).eq('recorded_at', recorded_at))
 
             if response.data:
                 logger.info(f"Updated emotion_status to {status} for {device_id}")
@@ -76,6 +127,36 @@ class SupabaseService:
             logger.error(f"Failed to update emotion_status: {e}")
             return False
 
+    async def list_stale_processing(
+        self,
+        cutoff: str,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Find rows stuck in emotion_status = processing
+
+        Args:
+            cutoff: UTC ISO timestamp; rows recorded before it are returned
+                    (the reaper checks the job marker for re-runs started later)
+            limit: Maximum rows returned
+            offset: Rows to skip (paging past rows that are still in flight)
+
+        Returns:
+            Rows with device_id and recorded_at, oldest first
+        """
+        try:
+            response = await self._execute(self.client.table('spot_features').select(
+                'device_id, recorded_at'
+            ).eq('emotion_status', 'processing').lt(
+                'recorded_at', cutoff
+            ).order('recorded_at').range(offset, offset + limit - 1))
+            return response.data or []
+
+        except Exception as e:
+            logger.error(f"Failed to list stale processing rows: {e}")
+            return []
+
     async def save_emotion_features(
         self,
         device_id: str,
@@ -94,31 +175,33 @@ class SupabaseService:
             Success status
         """
         try:
+            stored = await self._row_value(device_id, recorded_at, emotion_data)
+
             # Check if record exists
-            existing = self.client.table('spot_features').select('device_id').eq(
+            existing = await self._execute(self.client.table('spot_features').select('device_id').eq(
                 'device_id', device_id
-            ).eq('recorded_at', recorded_at).execute()
+            ).eq('recorded_at', recorded_at))
 
             if not existing.data:
                 # Create new record
                 logger.info(f"Creating new spot_features record for {device_id}")
 
-                response = self.client.table('spot_features').insert({
+                response = await self._execute(self.client.table('spot_features').insert({
                     'device_id': device_id,
                     'recorded_at': recorded_at,
-                    'emotion_features_result_hume': emotion_data,
+                    'emotion_features_result_hume': stored,
                     'emotion_status': 'completed' if not emotion_data.get('error') else 'failed'
-                }).execute()
+                }))
 
                 if response.data:
                     logger.info(f"Created new spot_features record for {device_id}")
                     return True
             else:
                 # Update existing record
-                response = self.client.table('spot_features').update({
-                    'emotion_features_result_hume': emotion_data,
+                response = await self._execute(self.client.table('spot_features').update({
+                    'emotion_features_result_hume': stored,
                     'emotion_status': 'completed' if not emotion_data.get('error') else 'failed'
-                }).eq('device_id', device_id).eq('recorded_at', recorded_at).execute()
+                }).eq('device_id', device_id).eq('recorded_at', recorded_at))
 
                 if response.data:
                     # Log summary
@@ -155,7 +238,8 @@ class SupabaseService:
     async def check_existing_features(
         self,
         device_id: str,
-        recorded_at: str
+        recorded_at: str,
+        full: bool = False
     ) -> Optional[Dict[str, Any]]:
         """
         Check if emotion features already exist
@@ -163,22 +247,35 @@ class SupabaseService:
         Args:
             device_id: Device identifier
             recorded_at: Recording timestamp
+            full: Fetch the segments of an offloaded result from S3 (otherwise the stored summary)
 
         Returns:
             Existing emotion features or None
+
+        Raises:
+            Exception: With full, if the row or its offloaded result can't be read
+                       (callers merging into the row must not overwrite it blindly)
         """
         try:
-            response = self.client.table('spot_features').select(
+            response = await self._execute(self.client.table('spot_features').select(
                 'emotion_features_result_hume'
-            ).eq('device_id', device_id).eq('recorded_at', recorded_at).execute()
+            ).eq('device_id', device_id).eq('recorded_at', recorded_at))
 
-            if response.data and response.data[0]:
-                return response.data[0].get('emotion_features_result_hume')
+            if not response.data or not response.data[0]:
+                return None
 
-            return None
+            features = response.data[0].get('emotion_features_result_hume')
+            if full and is_offloaded(features):
+                if not self.result_store:
+                    logger.warning(f"Result for {device_id} at {recorded_at} is offloaded but S3 is not configured")
+                    return features
+                return await self.result_store.load(features)
+            return features
 
         except Exception as e:
             logger.error(f"Failed to check existing features: {e}")
+            if full:
+                raise
             return None
 
     async def get_audio_file_info(
@@ -195,9 +292,9 @@ class SupabaseService:
             Audio file record or None
         """
         try:
-            response = self.client.table('audio_files').select(
+            response = await self._execute(self.client.table('audio_files').select(
                 'device_id, recorded_at, duration_seconds'
-            ).eq('file_path', file_path).execute()
+            ).eq('file_path', file_path))
 
             if response.data and response.data[0]:
                 return response.data[0]
@@ -206,4 +303,154 @@ class SupabaseService:
 
         except Exception as e:
             logger.error(f"Failed to get audio file info: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    async def get_recording_file(
+        self,
+        device_id: str,
+        recorded_at: str
+    ) -> Optional[str]:
+        """S3 file path of a recording, or None if unknown"""
+        try:
+            response = await self._execute(self.client.table('audio_files').select(
+                'file_path'
+            ).eq('device_id', device_id).eq('recorded_at', recorded_at).limit(1))
+
+            if response.data:
+                return response.data[0].get('file_path')
+            return None
+
+        except Exception as e:
+            logger.error(f"Failed to get file path for {device_id} at {recorded_at}: {e}")
+            return None
+
+    async def list_audio_files(
+        self,
+        device_id: str,
+        start: str,
+        end: str,
+        after: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Page through audio files of a device in recorded_at order
+
+        Args:
+            device_id: Device identifier
+            start: Inclusive lower bound for recorded_at
+            end: Exclusive upper bound for recorded_at
+            after: Keyset cursor - only rows with recorded_at > after
+            limit: Page size
+
+        Returns:
+            Audio file records (device_id, recorded_at, file_path, duration_seconds)
+        """
+        try:
+            query = self.client.table('audio_files').select(
+                'device_id, recorded_at, file_path, duration_seconds'
+            ).eq('device_id', device_id).lt('recorded_at', end)
+
+            if after:
+                query = query.gt('recorded_at', after)
+            else:
+                query = query.gte('recorded_at', start)
+
+            response = await self._execute(query.order('recorded_at').limit(limit))
+            return response.data or []
+
+        except Exception as e:
+            logger.error(f"Failed to list audio files for {device_id}: {e}")
+            raise
+
+    async def count_audio_files(
+        self,
+        device_id: str,
+        start: str,
+        end: str
+    ) -> int:
+        """Count audio files of a device in [start, end)"""
+        try:
+            response = await self._execute(self.client.table('audio_files').select(
+                'recorded_at', count='exact'
+            ).eq('device_id', device_id).gte('recorded_at', start).lt(
+                'recorded_at', end
+            ).limit(1))
+            return response.count or 0
+
+        except Exception as e:
+            logger.error(f"Failed to count audio files for {device_id}: {e}")
+            return 0
+
+    async def get_completed_recordings(
+        self,
+        device_id: str,
+        recorded_ats: Iterable[str]
+    ) -> Set[str]:
+        """
+        Find recordings that already have completed emotion features
+
+        Args:
+            device_id: Device identifier
+            recorded_ats: Recording timestamps to check
+
+        Returns:
+            recorded_at values with emotion_status = completed
+        """
+        recorded_ats = list(recorded_ats)
+        if not recorded_ats:
+            return set()
+
+        try:
+            response = await self._execute(self.client.table('spot_features').select(
+                'recorded_at'
+            ).eq('device_id', device_id).eq('emotion_status', 'completed').in_(
+                'recorded_at', recorded_ats
+            ))
+            return {row['recorded_at'] for row in response.data or []}
+
+        except Exception as e:
+            logger.error(f"Failed to check completed recordings for {device_id}: {e}")
+            raise
+
+    async def bulk_save_emotion_features(
+        self,
+        rows: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Upsert emotion features for many recordings in one request
+
+        Args:
+            rows: Dicts with device_id, recorded_at and emotion_data
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        try:
+            stored = await asyncio.gather(*(
+                self._row_value(row['device_id'], row['recorded_at'], row['emotion_data'])
+                for row in rows
+            ))
+            payload = [
+                {
+                    'device_id': row['device_id'],
+                    'recorded_at': row['recorded_at'],
+                    'emotion_features_result_hume': value,
+                    'emotion_status': 'completed' if not row['emotion_data'].get('error') else 'failed'
+                }
+                for row, value in zip(rows, stored)
+            ]
+
+            response = await self._execute(self.client.table('spot_features').upsert(
+                payload, on_conflict='device_id,recorded_at'
+            ))
+
+            written = len(response.data or [])
+            logger.info(f"Bulk saved emotion features for {written} recordings")
+            return written
+
+        except Exception as e:
+            logger.error(f"Failed to bulk save emotion features: {e}")
+            return 0
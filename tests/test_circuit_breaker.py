@@ -0,0 +1,53 @@
+"""Tests for app.circuit_breaker"""
+
+import asyncio
+
+from app import circuit_breaker as circuit_module
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, HumeGovernor
+
+
+def test_scattered_failures_do_not_pin_rate():
+    async def scenario():
+        governor = HumeGovernor(max_rate=5.0, min_rate=0.2)
+        for i in range(300):
+            if i % 60 == 0:
+                await governor.record_failure(status_code=500)
+            else:
+                await governor.record_success()
+        assert governor.state == CLOSED
+        assert governor.rate == governor.max_rate
+
+    asyncio.run(scenario())
+
+
+def test_failure_halves_rate():
+    async def scenario():
+        governor = HumeGovernor(max_rate=4.0, min_rate=0.2)
+        await governor.record_failure(status_code=503)
+        assert governor.rate == 2.0
+        await governor.record_success()
+        assert governor.rate == 2.4
+
+    asyncio.run(scenario())
+
+
+def test_cooldown_ends_without_a_submission(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_module.time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        governor = HumeGovernor(max_rate=4.0, min_rate=0.2, cooldown=30)
+        await governor.record_failure(status_code=503, retry_after=30)
+        assert governor.snapshot()["state"] == OPEN
+
+        # Only status polls run after the cooldown
+        now[0] += 31
+        await governor.wait_if_open()
+        assert governor.snapshot()["state"] == HALF_OPEN
+        assert governor.rate == governor.min_rate
+
+        # and a failure while half-open reopens the circuit
+        await governor.record_failure(status_code=500)
+        assert governor.snapshot()["state"] == OPEN
+
+    asyncio.run(scenario())
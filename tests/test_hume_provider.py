@@ -0,0 +1,149 @@
+"""Tests for app.hume_provider"""
+
+import asyncio
+
+from app import hume_provider as hume_module
+from app.circuit_breaker import HumeGovernor
+from app.hume_provider import HumeAPIError, HumeProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_turnaround_estimate_converges(monkeypatch):
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+    turnaround, round_trip = 10.0, 0.3
+
+    async def fake_sleep(delay):
+        clock.now += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(hume_module.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(hume_module.asyncio, "sleep", fake_sleep)
+
+    provider = HumeProvider("key", "secret")
+    models = provider.models_key(provider.build_models_config())
+    submitted = {}
+
+    async def get_job_status(job_id):
+        # The server answers halfway through the round trip
+        clock.now += round_trip / 2
+        done = clock.now - submitted[job_id] >= turnaround
+        clock.now += round_trip / 2
+        return {"state": {"status": "COMPLETED" if done else "IN_PROGRESS"}}
+
+    async def get_job_predictions(job_id, raw=False):
+        return []
+
+    provider.get_job_status = get_job_status
+    provider.get_job_predictions = get_job_predictions
+
+    # Start from an overestimate, as after a slow period
+    for _ in range(provider.turnaround_stats.min_samples):
+        provider.turnaround_stats.record(None, models, 13.5)
+
+    async def run_jobs():
+        estimates = []
+        for i in range(350):
+            job_id = f"job-{i}"
+            submitted[job_id] = clock.now
+            provider._submitted_at[job_id] = (clock.now, models)
+            await provider.wait_for_job(job_id)
+            estimates.append(provider.turnaround_stats.estimate(None, models))
+        return estimates
+
+    estimates = asyncio.run(run_jobs())
+
+    # Settles around the true turnaround (within the poll granularity) instead of drifting up
+    assert all(abs(estimate - turnaround) < 1.0 for estimate in estimates[-100:])
+
+
+def test_unknown_job_status_is_not_retried():
+    provider = HumeProvider("key", "secret")
+    calls = []
+
+    class Response:
+        status_code = 404
+        headers = {}
+
+    async def send(method, path, **kwargs):
+        calls.append(path)
+        return Response()
+
+    provider._send = send
+
+    async def main():
+        try:
+            await provider.get_job_status("expired")
+        except HumeAPIError as e:
+            assert e.status_code == 404
+        else:
+            raise AssertionError("expected HumeAPIError")
+
+    asyncio.run(main())
+    assert calls == ["/jobs/expired"]
+
+
+class _Response:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+        self.headers = {}
+
+
+def _throttled_provider(monkeypatch, statuses):
+    provider = HumeProvider("key", "secret")
+    provider.governor = HumeGovernor(max_rate=1000, min_rate=500, cooldown=60, max_wait=1)
+    posts = []
+
+    def request(method, url, **kwargs):
+        posts.append(url)
+        status = statuses.pop(0) if statuses else 429
+        return _Response(status, b'{"job_id": "job-1"}' if status == 200 else b"busy")
+
+    monkeypatch.setattr(hume_module.requests, "request", request)
+    return provider, posts
+
+
+def test_throttled_submission_is_requeued(monkeypatch):
+    provider, posts = _throttled_provider(monkeypatch, [429, 503, 200])
+    assert asyncio.run(provider.create_job("https://audio")) == "job-1"
+    assert len(posts) == 3
+
+
+def test_throttled_submission_fails_after_max_wait(monkeypatch):
+    # Keeps failing until the error ratio opens the circuit past max_wait
+    provider, posts = _throttled_provider(monkeypatch, [])
+
+    async def main():
+        try:
+            await provider.create_job("https://audio")
+        except HumeAPIError as e:
+            assert e.status_code == 429
+        else:
+            raise AssertionError("expected HumeAPIError")
+
+    asyncio.run(main())
+    assert len(posts) == provider.governor.min_requests
+
+
+def test_unwaited_submissions_are_pruned(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(hume_module.time, "monotonic", clock.monotonic)
+    provider = HumeProvider("key", "secret")
+    models = provider.models_key(provider.build_models_config())
+
+    provider._track_submission("abandoned", models)
+    clock.now += provider.poll_timeout / 2
+    provider._track_submission("recent", models)
+    clock.now += provider.poll_timeout / 2 + 1
+    provider._track_submission("new", models)
+
+    assert list(provider._submitted_at) == ["recent", "new"]
@@ -0,0 +1,125 @@
+"""Tests for app.hume_stream and the /ws/stream relay, against fake_hume_stream.py"""
+
+import os
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from websockets.asyncio.server import serve
+
+import fake_hume_stream
+import main
+from app.hume_provider import HumeProvider
+from app.hume_stream import HumeStreamPool, StreamSession
+
+CHUNK = os.urandom(32000 * 2)  # 2 seconds at the fake server's 16kHz 16-bit mono
+
+
+class FakeHumeServer:
+    """fake_hume_stream.handler on a free port, in its own thread and loop"""
+
+    def __init__(self):
+        self.connections = 0
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._stop = None
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._serve(),), daemon=True)
+        self._ready = threading.Event()
+
+    async def _handler(self, websocket):
+        self.connections += 1
+        await fake_hume_stream.handler(websocket)
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        async with serve(self._handler, "localhost", 0, max_size=None, close_timeout=0.1) as server:
+            port = next(iter(server.sockets)).getsockname()[1]
+            self.url = f"ws://localhost:{port}"
+            self._ready.set()
+            await self._stop.wait()
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+
+@pytest.fixture
+def fake_server():
+    with FakeHumeServer() as server:
+        yield server
+
+
+def test_pooled_connection_relays_chunks(fake_server):
+    async def main_():
+        pool = HumeStreamPool("key", url=fake_server.url, size=1)
+        session = StreamSession(HumeProvider("key", "secret"), chunk_seconds=2.0)
+
+        async with pool.connection() as upstream:
+            for _ in range(2):
+                message = session.add(await upstream.predict(CHUNK))
+                assert message["type"] == "chunk"
+        # The released connection is reused by the next session
+        async with pool.connection() as upstream:
+            session.add(await upstream.predict(CHUNK))
+        await pool.close()
+
+        result = session.result()
+        assert result["chunks"] == 3
+        assert [s["time"]["begin"] for s in result["speech_prosody"]["segments"]] == [0.0, 2.0, 4.0]
+        assert result["vocal_burst"]["total_segments"] == 3
+
+    asyncio.run(main_())
+    assert fake_server.connections == 1
+
+
+@pytest.fixture
+def stream_app(fake_server, monkeypatch):
+    pool = HumeStreamPool("key", url=fake_server.url, size=1)
+    monkeypatch.setattr(main, "hume_provider", HumeProvider("key", "secret"))
+    monkeypatch.setattr(main, "hume_stream_pool", pool)
+    monkeypatch.setattr(main, "supabase_service", None)
+    monkeypatch.setattr(main.job_tracker, "draining", False)
+    # No lifespan: the services above stand in for startup (each websocket
+    # session then runs in its own event loop, so use one session per test)
+    return TestClient(main.app)
+
+
+def test_stream_relay(stream_app, fake_server):
+    with stream_app.websocket_connect("/ws/stream?chunk_seconds=2") as ws:
+        for chunk in range(2):
+            ws.send_bytes(CHUNK)
+            message = ws.receive_json()
+            assert message["chunk"] == chunk
+            assert message["offset"] == chunk * 2.0
+            assert message["speech_prosody"]["total_segments"] == 1
+        ws.send_text('{"type": "end"}')
+        summary = ws.receive_json()
+        assert summary == {"type": "summary", "chunks": 2, "total_segments": 4, "saved": False}
+
+    assert fake_server.connections == 1
+
+
+def test_idle_session_leases_no_upstream(stream_app, fake_server):
+    with stream_app.websocket_connect("/ws/stream") as ws:
+        ws.send_text('{"type": "end"}')
+        assert ws.receive_json()["chunks"] == 0
+
+    assert fake_server.connections == 0
+
+
+def test_stream_rejected_while_draining(stream_app, fake_server, monkeypatch):
+    monkeypatch.setattr(main.job_tracker, "draining", True)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with stream_app.websocket_connect("/ws/stream") as ws:
+            ws.send_text('{"type": "end"}')
+            ws.receive_json()
+
+    assert closed.value.code == 1013
+    assert fake_server.connections == 0
@@ -0,0 +1,75 @@
+"""Tests for app.reaper"""
+
+import asyncio
+
+from app.hume_provider import HumeProvider
+from app.job_registry import JobRegistry
+from app.reaper import StuckJobReaper
+
+RAW = (
+    b'[{"source": {"url": "u"}, "results": {"predictions": [{"models": {"prosody": {'
+    b'"metadata": {"confidence": 0.9}, "grouped_predictions": [{"predictions": [{'
+    b'"time": {"begin": 0, "end": 1}, "text": "hi", "emotions": [{"name": "Joy", "score": 0.7}]'
+    b'}]}]}}}]}}]'
+)
+
+
+class FakeDB:
+    def __init__(self, rows, write_ok=True):
+        self.rows = rows
+        self.write_ok = write_ok
+        self.saved = []
+
+    async def list_stale_processing(self, cutoff, limit=50, offset=0):
+        return self.rows[offset:offset + limit]
+
+    async def get_recording_file(self, device_id, recorded_at):
+        return None
+
+    async def bulk_save_emotion_features(self, rows):
+        if not self.write_ok:
+            return 0
+        self.saved += rows
+        return len(rows)
+
+
+def _reaper(db, registry, notes):
+    provider = HumeProvider("key", "secret")
+
+    async def get_job_status(job_id):
+        return {"state": {"status": "COMPLETED"}}
+
+    async def get_job_predictions(job_id, raw=False):
+        return RAW
+
+    async def notify(*args):
+        notes.append(args)
+
+    provider.get_job_status = get_job_status
+    provider.get_job_predictions = get_job_predictions
+    return StuckJobReaper(provider, db, registry, requeue=lambda spec: None, notify=notify)
+
+
+def test_failed_save_keeps_marker_for_next_sweep():
+    async def main():
+        registry = JobRegistry()
+        await registry.set_marker("d", "1", {
+            "file_path": "f", "job_id": "job", "started_at": "2026-01-01T00:00:00"
+        })
+        db, notes = FakeDB([{"device_id": "d", "recorded_at": "1"}], write_ok=False), []
+        reaper = _reaper(db, registry, notes)
+
+        counts = await reaper.sweep()
+        assert counts["recovered"] == 0 and counts["skipped"] == 1
+        assert notes == []
+        assert (await registry.get_marker("d", "1"))["job_id"] == "job"
+
+        # The claim was released, so the next sweep recovers the same job
+        db.write_ok = True
+        counts = await reaper.sweep()
+        assert counts["recovered"] == 1
+        assert db.saved[0]["emotion_data"]["total_segments"] == 1
+        assert len(notes) == 1
+        assert await registry.get_marker("d", "1") is None
+
+    asyncio.run(main())
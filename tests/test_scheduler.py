@@ -0,0 +1,101 @@
+"""Tests for app.scheduler"""
+
+import asyncio
+
+from app.scheduler import JobScheduler
+
+
+async def _hold(scheduler, priority, key, started, release):
+    async with scheduler.slot(priority, key):
+        started.append(key)
+        await release.wait()
+
+
+def test_saturated_device_does_not_block_others():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=20, per_key_limit=3, live_reserved=4)
+        started, release = [], asyncio.Event()
+
+        # Device a at its quota, with one more job waiting
+        tasks = [asyncio.create_task(_hold(scheduler, "live", "a", started, release)) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert started.count("a") == 3
+        assert scheduler.snapshot()["waiting"]["live"] == 1
+
+        # Device b arrives with 17 slots free and must start at once
+        tasks.append(asyncio.create_task(_hold(scheduler, "live", "b", started, release)))
+        await asyncio.sleep(0)
+        assert "b" in started
+        assert scheduler.running == 4
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_queued_bulk_does_not_block_live_reserve():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=4, per_key_limit=0, live_reserved=2)
+        started, release = [], asyncio.Event()
+
+        # Bulk fills the non-reserved slots and queues more work
+        tasks = [asyncio.create_task(_hold(scheduler, "bulk", f"b{i}", started, release)) for i in range(5)]
+        await asyncio.sleep(0)
+        assert scheduler.running == 2
+
+        tasks.append(asyncio.create_task(_hold(scheduler, "live", "live", started, release)))
+        await asyncio.sleep(0)
+        assert "live" in started
+        assert scheduler.snapshot()["waiting"]["bulk"] == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=1, per_key_limit=0, live_reserved=0)
+        started, release = [], asyncio.Event()
+
+        first = asyncio.create_task(_hold(scheduler, "live", "a", started, release))
+        second = asyncio.create_task(_hold(scheduler, "live", "b", started, release))
+        await asyncio.sleep(0)
+        second.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()["waiting"]["live"] == 0
+
+        release.set()
+        await first
+        assert scheduler.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_holder_and_waiter_cancelled_together():
+    async def scenario():
+        scheduler = JobScheduler(max_concurrent=1, per_key_limit=0, live_reserved=0)
+        started, release = [], asyncio.Event()
+
+        holder = asyncio.create_task(_hold(scheduler, "live", "a", started, release))
+        waiter = asyncio.create_task(_hold(scheduler, "live", "b", started, release))
+        await asyncio.sleep(0)
+        assert started == ["a"]
+
+        # As the shutdown drain does: cancel every task in the same turn
+        holder.cancel()
+        waiter.cancel()
+        results = await asyncio.gather(holder, waiter, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert scheduler.running == 0
+        assert scheduler.snapshot()["waiting"]["live"] == 0
+
+        # The slot is usable again
+        release.set()
+        await _hold(scheduler, "live", "c", started, release)
+        assert started[-1] == "c"
+
+    asyncio.run(scenario())